@@ -1,99 +1,248 @@
 import cv2
-import face_recognition
 import os
 import pickle
 import numpy as np
 import sys
-from PIL import Image, ImageEnhance
 # Add backend directory to path for imports
 backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 if backend_path not in sys.path:
     sys.path.insert(0, backend_path)
 from app.services.firebase_service import FirebaseService  # type: ignore
+from app.models.face_gallery import FaceGallery  # type: ignore
+from app.models.ann_index import IVFIndex, build_index_report, index_path_for  # type: ignore
+from app.models.gallery_condensation import condensation_report, condense_gallery, format_condensation_report  # type: ignore
+from app.models.quantization import QuantizedCodes  # type: ignore
+from app.models.model_artifact import read_artifact, write_artifact  # type: ignore
+from app.models.training_manifest import TrainingManifest, manifest_path_for  # type: ignore
+from app.utils.image_utils import decode_image_bytes, get_face_encoding, preprocess_image_array, preprocess_image_file  # type: ignore
+from app.utils.image_ingest import ingest_params, ingest_rgb  # type: ignore
+from app.services.encoding_pool import EncodingCancelled, ParallelEncoder  # type: ignore
+from app.utils.face_detection import compute_encodings, detect_face_locations, detection_params  # type: ignore
+from app.utils.metrics import OUTCOMES, StageTimer  # type: ignore
 
 class FaceRecognitionModel:
     def __init__(self, dataset_path="image_dataset"):
         self.dataset_path = dataset_path
-        self.known_face_encodings = []
-        self.known_face_names = []
-        self.model_file = "face_model.pkl"
+        self.model_file = "face_model.gallery"
+        self.legacy_model_file = "face_model.pkl"
+        self.verify_model_checksum = False
         self.firebase_service = FirebaseService()
+        self.gallery = FaceGallery.from_encodings([], [])
+        self.use_ann_index = False
+        self.ann_n_probe = 8
+        self.use_clahe = False
+        # Optional CascadePrefilter that rejects no-face / multi-face frames before dlib
+        self.prefilter = None
+        self.encoding_workers = None
+        # Per-employee template budget and near-duplicate distance for gallery condensation
+        self.max_templates = 8
+        self.dedup_distance = 0.15
+        # 'float16' / 'int8' quantized first pass with exact re-ranking (None = exact float32 only)
+        self.quantization = None
+        # 1:1 verification of expected_user with a bounded impostor check ('index', 'sample' or 'off')
+        self.verify_expected_user = True
+        self.impostor_check = 'index'
+        self.impostor_sample_size = 256
     
-    def preprocess_image(self, image_path):
-        """Enhance image quality for better recognition"""
-        try:
-            # Load with PIL for preprocessing
-            pil_image = Image.open(image_path)
-            
-            # Convert to RGB if needed
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            
-            # Enhance contrast and brightness
-            enhancer = ImageEnhance.Contrast(pil_image)
-            pil_image = enhancer.enhance(1.2)
-            
-            enhancer = ImageEnhance.Brightness(pil_image)
-            pil_image = enhancer.enhance(1.1)
-            
-            # Convert to numpy array for face_recognition
-            return np.array(pil_image)
-        except:
-            # Fallback to original loading
-            return face_recognition.load_image_file(image_path)
-    
-    def train_model(self):
-        """Train model on local dataset only (use train_combined_model.py for Firebase integration)"""
-        print("Training face recognition model on local dataset...")
+    @property
+    def known_face_encodings(self):
+        return self.gallery.encodings
+    
+    @property
+    def known_face_names(self):
+        return self.gallery.row_names()
+    
+    @property
+    def encoder_params(self):
+        # Anything that changes the encodings produced for an image belongs here
+        preprocess = 'contrast1.2-brightness1.1' + ('-clahe' if self.use_clahe else '')
+        return {'model': 'large', 'preprocess': preprocess, 'detection': detection_params(), 'ingest': ingest_params()}
+    
+    @property
+    def match_threshold(self):
+        return self.gallery.match_threshold
+    
+    def set_gallery(self, gallery):
+        """Atomically publish a fully built gallery to recognition requests
         
-        for person_name in os.listdir(self.dataset_path):
+        Requests take one reference to ``self.gallery`` and use it for the
+        whole match, so they see either the old or the new gallery.
+        """
+        gallery.match_threshold = self.threshold_for(gallery.names)
+        self.gallery = gallery
+    
+    @staticmethod
+    def threshold_for(names):
+        """Adaptive threshold based on person"""
+        return 0.6 if any('MohamedSamier' in name for name in names) else 0.5
+    
+    def condense(self, encodings, names):
+        """Build the gallery from per-image encodings, capped to ``max_templates`` per employee
+        
+        The held-out accuracy of the full and condensed galleries is printed
+        so the effect of the budget is visible on every training run.
+        """
+        gallery = FaceGallery.from_encodings(encodings, names)
+        if not self.max_templates and not self.dedup_distance:
+            return gallery
+        
+        tolerance = self.threshold_for(gallery.names)
+        report = condensation_report(encodings, names, self.max_templates, self.dedup_distance, tolerance)
+        condensed = condense_gallery(gallery, self.max_templates, self.dedup_distance)
+        print(f"Condensed gallery from {len(gallery)} to {len(condensed)} templates "
+              f"(at most {self.max_templates or 'unlimited'} per employee)")
+        print(format_condensation_report(report))
+        return condensed
+    
+    def attach_codes(self, gallery):
+        """Quantize the gallery for the first scoring pass when quantization is enabled"""
+        if not self.quantization or (gallery.codes is not None and gallery.codes.kind == self.quantization):
+            return
+        gallery.codes = QuantizedCodes.encode(gallery.encodings, self.quantization)
+        print(f"{self.quantization} codes: {gallery.codes.nbytes / 1024:.1f} KB vs {gallery.encodings.nbytes / 1024:.1f} KB float32 "
+              f"(max error {gallery.codes.error_bound:.4f})")
+    
+    def build_ann_index(self, gallery):
+        """Build the IVF index over a gallery and report recall against exact search"""
+        index, recall = build_index_report(gallery.encodings, n_probe=self.ann_n_probe)
+        gallery.index = index
+        print(f"ANN index built with {index.n_lists} lists (recall@10 vs exact at n_probe={self.ann_n_probe}: {recall:.1%})")
+    
+    def preprocess_image(self, image):
+        """Enhance image quality for better recognition
+        
+        Accepts a file path, encoded image bytes or a decoded RGB array, so
+        request handlers never have to go through the filesystem.
+        """
+        if isinstance(image, np.ndarray):
+            return preprocess_image_array(image, clahe=self.use_clahe)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return preprocess_image_array(decode_image_bytes(image), clahe=self.use_clahe)
+        return preprocess_image_file(image, clahe=self.use_clahe)
+    
+    def load_image(self, image):
+        """Decode a file path or encoded bytes into an RGB array (arrays pass through)"""
+        if isinstance(image, np.ndarray):
+            return image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return decode_image_bytes(image)
+        return ingest_rgb(image)
+    
+    def scan_dataset(self):
+        """Dataset images as sorted ``(relative_path, person_name, image_path)`` tuples"""
+        images = []
+        for person_name in sorted(os.listdir(self.dataset_path)):
             person_folder = os.path.join(self.dataset_path, person_name)
             
             if not os.path.isdir(person_folder):
                 continue
-                
-            print(f"Processing images for {person_name}...")
             
-            for image_file in os.listdir(person_folder):
+            for image_file in sorted(os.listdir(person_folder)):
                 if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    image_path = os.path.join(person_folder, image_file)
-                    
-                    # Enhanced preprocessing for robustness
-                    image = self.preprocess_image(image_path)
-                    
-                    # Get face encodings
-                    face_encodings = face_recognition.face_encodings(image, model='large')
-                    
-                    if face_encodings:
-                        self.known_face_encodings.append(face_encodings[0])
-                        self.known_face_names.append(person_name)
-                        print(f"  Added encoding for {person_name} from {image_file}")
-        
-        # Save the model
-        self.save_model()
-        print(f"Model trained with {len(self.known_face_encodings)} face encodings")
+                    images.append((f"{person_name}/{image_file}", person_name, os.path.join(person_folder, image_file)))
+        return images
+    
+    def train_model(self, progress_callback=None, cancel_event=None):
+        """Train model on local dataset only (use train_combined_model.py for Firebase integration)
+        
+        Only images that are new or changed since the last run are encoded;
+        everything else is reused from the training manifest. The live
+        gallery is only replaced once the new one is complete; setting
+        ``cancel_event`` aborts with EncodingCancelled and leaves it untouched.
+        """
+        print("Training face recognition model on local dataset...")
+        manifest = TrainingManifest(manifest_path_for(self.model_file))
+        manifest.load()
+        
+        images = self.scan_dataset()
+        removed = manifest.prune([relative_path for relative_path, _, _ in images])
+        
+        pending = [image for image in images
+                   if manifest.lookup(image[0], image[2], self.encoder_params) is None]
+        
+        # Enhanced preprocessing for robustness, encoded across all cores
+        encoder = ParallelEncoder(self.encoding_workers, label="Training")
+        results = encoder.map([image_path for _, _, image_path in pending], model='large', preprocess=True, clahe=self.use_clahe,
+                              progress_callback=progress_callback, cancel_event=cancel_event)
+        
+        for (relative_path, person_name, image_path), result in zip(pending, results):
+            if result['error']:
+                # The entry from before the change must not stand in for the new content
+                manifest.discard(relative_path)
+                print(f"  Error processing {relative_path}: {result['error']}")
+                continue
+            manifest.record(relative_path, image_path, self.encoder_params, result['encodings'])
+            if result['encodings']:
+                print(f"  Added encoding for {person_name} from {os.path.basename(image_path)}")
+            else:
+                print(f"  No face found for {person_name} in {os.path.basename(image_path)}")
+        
+        manifest.save()
+        print(f"Encoded {len(pending)} new or changed images, reused {len(images) - len(pending)}, dropped {len(removed)} removed")
+        if cancel_event is not None and cancel_event.is_set():
+            raise EncodingCancelled("Retraining cancelled before the new gallery was built")
+        
+        # Rebuild the gallery deterministically from the manifest
+        encodings = []
+        names = []
+        for relative_path, person_name, _ in images:
+            entry = manifest.entries.get(relative_path)
+            if entry and entry['encodings']:
+                encodings.append(entry['encodings'][0])
+                names.append(person_name)
+        
+        # Cap templates per employee, save the model, then swap it in
+        gallery = self.condense(encodings, names)
+        self.build_ann_index(gallery)
+        self.attach_codes(gallery)
+        self.save_model(gallery)
+        # Serve quantized galleries from the memory map so only the codes stay resident
+        if not (self.quantization and self.load_model()):
+            self.set_gallery(gallery)
+        print(f"Model trained with {len(gallery)} face encodings")
         print("Note: Use train_combined_model.py to include Firebase photos in training")
     
-    def save_model(self):
-        """Save the trained model to file"""
-        model_data = {
-            'encodings': self.known_face_encodings,
-            'names': self.known_face_names
-        }
-        with open(self.model_file, 'wb') as f:
-            pickle.dump(model_data, f)
+    def save_model(self, gallery=None):
+        """Save the trained model as a versioned gallery artifact"""
+        if gallery is None:
+            gallery = self.gallery
+        write_artifact(self.model_file, gallery)
+        if gallery.index is not None:
+            gallery.index.save(index_path_for(self.model_file))
         print(f"Model saved to {self.model_file}")
     
     def load_model(self):
-        """Load the trained model from file"""
+        """Memory-map the trained model, falling back to a legacy pickle"""
         if os.path.exists(self.model_file):
-            with open(self.model_file, 'rb') as f:
+            try:
+                gallery = read_artifact(self.model_file, verify=self.verify_model_checksum)
+            except ValueError as e:
+                print(f"Failed to load model from {self.model_file}: {e}")
+                return False
+        elif os.path.exists(self.legacy_model_file):
+            with open(self.legacy_model_file, 'rb') as f:
                 model_data = pickle.load(f)
-                self.known_face_encodings = model_data['encodings']
-                self.known_face_names = model_data['names']
-            print(f"Model loaded with {len(self.known_face_encodings)} face encodings")
-            return True
-        return False
+            gallery = FaceGallery.from_encodings(model_data['encodings'], model_data['names'])
+        else:
+            return False
+        
+        self.load_ann_index(gallery)
+        self.attach_codes(gallery)
+        self.set_gallery(gallery)
+        print(f"Model loaded with {len(gallery)} face encodings")
+        return True
+    
+    def load_ann_index(self, gallery):
+        """Attach the ANN index saved next to the model if it matches the gallery"""
+        index_path = index_path_for(self.model_file)
+        if not os.path.exists(index_path):
+            return False
+        index = IVFIndex.load(index_path)
+        if index.n_rows != len(gallery):
+            print(f"Ignoring stale ANN index at {index_path}")
+            return False
+        gallery.index = index
+        return True
     
     def get_adaptive_threshold(self, distances, expected_user=None):
         """Strict threshold for employee recognition"""
@@ -103,67 +252,58 @@ class FaceRecognitionModel:
         # Strict threshold - only trained employees
         return 0.5
     
-    def recognize_face(self, image_path, expected_user=None):
-        """Enhanced face recognition trained on both local dataset and Firebase photos"""
-        # Load and preprocess the image
-        image = self.preprocess_image(image_path)
+    def locate_probe(self, image):
+        """Decoded, preprocessed probe and its faces as ``(image, locations, face_count)``
         
-        # Find face encodings with large model for better accuracy
-        face_encodings = face_recognition.face_encodings(image, model='large')
-        
-        if not face_encodings:
-            return None, "No face detected in the image. Please ensure proper lighting and positioning."
-        
-        if len(face_encodings) > 1:
-            return None, "Multiple faces detected. Please ensure only one person is in the frame."
+        Faces are detected once, on a downscaled copy, and the boxes are
+        reused for encoding. When the prefilter rejects the frame no boxes
+        are returned and ``face_count`` is the cascade's count.
+        """
+        image = self.load_image(image)
         
-        face_encoding = face_encodings[0]
+        # Reject empty and crowded frames cheaply before the dlib pipeline
+        if self.prefilter is not None:
+            error_type, face_count = self.prefilter.check(image)
+            if error_type:
+                return image, [], face_count
         
-        # Calculate distances to all known faces
-        face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
+        # Preprocess the image
+        image = self.preprocess_image(image)
         
-        if len(face_distances) == 0:
-            return None, "No trained faces in database. Please train the model first."
+        locations = detect_face_locations(image)
+        return image, locations, len(locations)
+    
+    def encode_located(self, image, locations, face_count):
+        """Encoding of the single located face as ``(encoding, error_message)``"""
+        if face_count == 0:
+            OUTCOMES.inc('recognize', 'no_face')
+            return None, "No face detected in the image. Please ensure proper lighting and positioning."
         
-        # Adaptive threshold based on person
-        threshold = 0.6 if 'MohamedSamier' in str(self.known_face_names) else 0.5
+        if face_count > 1:
+            OUTCOMES.inc('recognize', 'multiple_faces')
+            return None, "Multiple faces detected. Please ensure only one person is in the frame."
         
-        # Find best matches
-        matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=threshold)
+        # Encode with the large model at full resolution
+        return compute_encodings(image, locations, model='large')[0], None
+    
+    def encode_probe(self, image):
+        """Single face encoding for a recognition request as ``(encoding, error_message)``
         
-        if not any(matches):
+        ``image`` may be a file path, encoded image bytes or an RGB array.
+        """
+        return self.encode_located(*self.locate_probe(image))
+    
+    def decide(self, match, expected_user=None):
+        """Turn a gallery match ``(name, mean_distance, min_distance)`` into ``(name, message)``"""
+        if match is None:
+            OUTCOMES.inc('recognize', 'unknown')
             return None, "This person is not in our employee database. Access denied."
         
-        # Get all matching indices and their distances
-        matching_indices = [i for i, match in enumerate(matches) if match]
-        matching_distances = [face_distances[i] for i in matching_indices]
-        matching_names = [self.known_face_names[i] for i in matching_indices]
-        
-        # Count votes for each person (multiple encodings per person)
-        name_votes = {}
-        for i, name in enumerate(matching_names):
-            if name not in name_votes:
-                name_votes[name] = []
-            name_votes[name].append(matching_distances[i])
-        
-        # Choose person with best average distance
-        best_person = None
-        best_avg_distance = float('inf')
-        
-        for name, distances in name_votes.items():
-            avg_distance = np.mean(distances)
-            if avg_distance < best_avg_distance:
-                best_person = name
-                best_avg_distance = avg_distance
-        
-        if not best_person:
-            return None, "No valid match found."
-        
-        employee_name = best_person
-        best_distance = best_avg_distance
+        employee_name, best_distance, _ = match
         
         # Prevent cross-employee attendance if expected_user is specified
         if expected_user and employee_name.lower() != expected_user.lower():
+            OUTCOMES.inc('recognize', 'denied')
             return None, f"Access denied: {employee_name} cannot take attendance for {expected_user}"
         
         # Calculate confidence
@@ -172,9 +312,159 @@ class FaceRecognitionModel:
         # Adaptive confidence threshold
         min_confidence = 0.30 if employee_name == 'MohamedSamier' else 0.40
         if confidence < min_confidence:
+            OUTCOMES.inc('recognize', 'low_confidence')
             return None, f"Recognition confidence too low. Please try again with better lighting."
         
+        OUTCOMES.inc('recognize', 'matched')
         return employee_name, f"Welcome, {employee_name}. Attendance recorded successfully. Confidence: {confidence:.0%}"
+    
+    def recognize_face(self, image, expected_user=None):
+        """Enhanced face recognition trained on both local dataset and Firebase photos
+        
+        ``image`` may be a file path, encoded image bytes or an RGB array.
+        """
+        face_encoding, error = self.encode_probe(image)
+        if error:
+            return None, error
+        return self.match_probe(face_encoding, expected_user)
+    
+    def match_probe(self, face_encoding, expected_user=None):
+        """Match one probe encoding against the gallery and validate it as ``(name, message)``"""
+        # One reference for the whole match so a concurrent retrain cannot swap it midway
+        gallery = self.gallery
+        if len(gallery) == 0:
+            return None, "No trained faces in database. Please train the model first."
+        
+        with StageTimer('matching'):
+            verification = self.verify_probe(gallery, face_encoding, expected_user)
+            if verification is None:
+                match = self.identify_probe(gallery, face_encoding)
+        
+        if verification is not None:
+            return self.decide_verified(verification, expected_user)
+        return self.decide(match, expected_user)
+    
+    def verify_probe(self, gallery, face_encoding, expected_user):
+        """``gallery.verify`` result for the claimed employee, or None when the probe needs full identification"""
+        if not (expected_user and self.verify_expected_user):
+            return None
+        # Score only the claimed employee's templates plus a bounded impostor check
+        return gallery.verify(face_encoding, expected_user, gallery.match_threshold,
+                              impostor_check=self.impostor_check,
+                              sample_size=self.impostor_sample_size, n_probe=self.ann_n_probe)
+    
+    def identify_probe(self, gallery, face_encoding):
+        """Best gallery match for one probe, through the ANN index or quantized codes when enabled"""
+        # Distances, per-employee aggregation and best match in one vectorized pass
+        return gallery.match(face_encoding, gallery.match_threshold, use_index=self.use_ann_index, n_probe=self.ann_n_probe,
+                             use_codes=bool(self.quantization))
+    
+    def decide_verified(self, verification, expected_user):
+        """Turn a ``gallery.verify`` result into ``(name, message)``"""
+        employee_name, best_distance, impostor_name = verification
+        if impostor_name is not None:
+            OUTCOMES.inc('recognize', 'denied')
+            return None, f"Access denied: {impostor_name} cannot take attendance for {expected_user}"
+        match = (employee_name, best_distance, None) if np.isfinite(best_distance) else None
+        return self.decide(match, expected_user)
+    
+    def detect_and_recognize(self, image, expected_user=None):
+        """Detection and recognition of one frame from a single decode and detection pass
+        
+        Returns ``(face_count, boxes, name, message)`` with boxes as
+        ``(top, right, bottom, left)`` tuples; the frame is only encoded and
+        matched when exactly one face was found.
+        """
+        image, locations, face_count = self.locate_probe(image)
+        face_encoding, error = self.encode_located(image, locations, face_count)
+        name, message = (None, error) if error else self.match_probe(face_encoding, expected_user)
+        return face_count, [tuple(int(value) for value in box) for box in locations], name, message
+    
+    def encode_capture(self, image):
+        """Stored-photo comparison encoding of a capture as ``(error_type, face_count, encoding)``
+        
+        The prefilter runs first, as for recognition; a rejected capture
+        returns its error type and the cascade's face count, otherwise both
+        are None and ``encoding`` is None when dlib finds no face.
+        """
+        image = self.load_image(image)
+        if self.prefilter is not None:
+            error_type, face_count = self.prefilter.check(image)
+            if error_type:
+                return error_type, face_count, None
+        return None, None, get_face_encoding(image)
+    
+    def encode_photo(self, image):
+        """Stored-photo comparison encoding of a stored photo, or None when it has no face"""
+        return get_face_encoding(self.load_image(image))
+    
+    def detect_and_encode(self, image):
+        """Face boxes of a capture and, when there is exactly one, its stored-photo comparison encoding"""
+        image = self.load_image(image)
+        locations = detect_face_locations(image)
+        encoding = compute_encodings(image, locations, model='small')[0] if len(locations) == 1 else None
+        return [tuple(int(value) for value in box) for box in locations], encoding
+    
+    def try_encode_probe(self, image):
+        """``encode_probe`` that reports processing errors instead of raising them"""
+        try:
+            return self.encode_probe(image)
+        except Exception as e:
+            return None, f"Failed to process image: {e}"
+    
+    def recognize_batch(self, images, expected_users):
+        """Recognize several images, scoring the probes against the gallery together
+        
+        Every probe gets the decision ``recognize_face`` would give it.
+        Returns ``(name, message)`` per image in input order; a failure on
+        one image does not affect the others.
+        """
+        return self.score_batch([self.try_encode_probe(image) for image in images], expected_users)
+    
+    def score_batch(self, encoded, expected_users):
+        """Match already encoded probes, given as ``(encoding, error_message)`` pairs, as ``match_probe`` does
+        
+        Probes with an expected user are verified 1:1 when that is enabled;
+        the rest are identified, all in one matrix product when the exact
+        float32 pass is what ``match_probe`` would use.
+        """
+        results = [None] * len(encoded)
+        probes = []
+        probe_items = []
+        for item, (face_encoding, error) in enumerate(encoded):
+            if error:
+                results[item] = (None, error)
+            else:
+                probes.append(face_encoding)
+                probe_items.append(item)
+        
+        if not probes:
+            return results
+        
+        gallery = self.gallery
+        if len(gallery) == 0:
+            for item in probe_items:
+                results[item] = (None, "No trained faces in database. Please train the model first.")
+            return results
+        
+        with StageTimer('matching'):
+            verifications = [self.verify_probe(gallery, probe, expected_users[item]) for probe, item in zip(probes, probe_items)]
+            identify = [index for index, verification in enumerate(verifications) if verification is None]
+            if (self.use_ann_index and gallery.index is not None) or (self.quantization and gallery.codes is not None):
+                # The ANN and quantized first passes are per probe
+                matches = [self.identify_probe(gallery, probes[index]) for index in identify]
+            elif identify:
+                matches = gallery.match_batch([probes[index] for index in identify], gallery.match_threshold)
+            else:
+                matches = []
+        
+        identified = dict(zip(identify, matches))
+        for index, (item, verification) in enumerate(zip(probe_items, verifications)):
+            if verification is not None:
+                results[item] = self.decide_verified(verification, expected_users[item])
+            else:
+                results[item] = self.decide(identified[index], expected_users[item])
+        return results
 
 if __name__ == "__main__":
     try:
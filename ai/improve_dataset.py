@@ -1,9 +1,14 @@
 import cv2
-import face_recognition
 import os
+import sys
 import numpy as np
 from PIL import Image, ImageEnhance
 import shutil
+# Add backend directory to path for imports
+backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+if backend_path not in sys.path:
+    sys.path.insert(0, backend_path)
+from app.services.encoding_pool import ParallelEncoder, encode_image  # type: ignore
 
 class DatasetImprover:
     def __init__(self, dataset_path="image_dataset"):
@@ -15,28 +20,38 @@ class DatasetImprover:
         print("Analyzing dataset quality...")
         issues = []
         
+        # Check every image across all cores, then report per person
+        jobs = []
+        by_person = {}
         for person_name in os.listdir(self.dataset_path):
             person_folder = os.path.join(self.dataset_path, person_name)
             
             if not os.path.isdir(person_folder):
                 continue
             
+            by_person[person_name] = []
+            for image_file in os.listdir(person_folder):
+                if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
+                    jobs.append((person_name, image_file, os.path.join(person_folder, image_file)))
+        
+        results = ParallelEncoder(label="Quality check").map([image_path for _, _, image_path in jobs], model='small', stats=True)
+        
+        for (person_name, image_file, _), result in zip(jobs, results):
+            by_person[person_name].append((image_file, result))
+        
+        for person_name, person_results in by_person.items():
             print(f"\nAnalyzing {person_name}:")
             person_issues = []
-            image_count = 0
+            image_count = len(person_results)
             valid_images = 0
             
-            for image_file in os.listdir(person_folder):
-                if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    image_count += 1
-                    image_path = os.path.join(person_folder, image_file)
-                    
-                    # Check image quality
-                    issue = self.check_image_quality(image_path, image_file)
-                    if issue:
-                        person_issues.append(issue)
-                    else:
-                        valid_images += 1
+            for image_file, result in person_results:
+                # Check image quality
+                issue = self.describe_quality_issue(image_file, result)
+                if issue:
+                    person_issues.append(issue)
+                else:
+                    valid_images += 1
             
             print(f"  Total images: {image_count}")
             print(f"  Valid images: {valid_images}")
@@ -53,39 +68,36 @@ class DatasetImprover:
     
     def check_image_quality(self, image_path, image_file):
         """Check individual image quality"""
-        try:
-            # Load image
-            image = face_recognition.load_image_file(image_path)
-            face_encodings = face_recognition.face_encodings(image)
-            
-            # Check for face detection
-            if len(face_encodings) == 0:
-                return f"{image_file}: No face detected"
-            
-            if len(face_encodings) > 1:
-                return f"{image_file}: Multiple faces detected"
-            
-            # Check image size and quality
-            pil_image = Image.open(image_path)
-            width, height = pil_image.size
-            
-            if width < 200 or height < 200:
-                return f"{image_file}: Image too small ({width}x{height})"
-            
-            # Check if image is too dark or bright
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-            mean_brightness = np.mean(gray)
-            
-            if mean_brightness < 50:
-                return f"{image_file}: Image too dark (brightness: {mean_brightness:.1f})"
-            
-            if mean_brightness > 200:
-                return f"{image_file}: Image too bright (brightness: {mean_brightness:.1f})"
-            
-            return None
-            
-        except Exception as e:
-            return f"{image_file}: Error loading image - {str(e)}"
+        return self.describe_quality_issue(image_file, encode_image(image_path, model='small', stats=True))
+    
+    def describe_quality_issue(self, image_file, result):
+        """Turn an encoding result with image stats into a quality issue, or None"""
+        if result['error']:
+            return f"{image_file}: Error loading image - {result['error']}"
+        
+        # Check for face detection
+        if result['face_count'] == 0:
+            return f"{image_file}: No face detected"
+        
+        if result['face_count'] > 1:
+            return f"{image_file}: Multiple faces detected"
+        
+        # Check image size and quality
+        width, height = result['width'], result['height']
+        
+        if width < 200 or height < 200:
+            return f"{image_file}: Image too small ({width}x{height})"
+        
+        # Check if image is too dark or bright
+        mean_brightness = result['brightness']
+        
+        if mean_brightness < 50:
+            return f"{image_file}: Image too dark (brightness: {mean_brightness:.1f})"
+        
+        if mean_brightness > 200:
+            return f"{image_file}: Image too bright (brightness: {mean_brightness:.1f})"
+        
+        return None
     
     def enhance_images(self):
         """Enhance existing images for better recognition"""
@@ -1,44 +1,52 @@
 #!/usr/bin/env python3
 import os
+import sys
 import face_recognition
-from PIL import Image
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from app.services.encoding_pool import ParallelEncoder
+
 def analyze_dataset():
     dataset_path = "ai/image_dataset"
     
     print("Analyzing Employee Dataset Quality")
     print("=" * 50)
     
+    # Encode the whole dataset across all cores, then report per employee
+    jobs = []
+    by_person = {}
     for person_name in os.listdir(dataset_path):
         person_folder = os.path.join(dataset_path, person_name)
         if not os.path.isdir(person_folder):
             continue
-            
+        
+        by_person[person_name] = []
+        for image_file in os.listdir(person_folder):
+            if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
+                jobs.append((person_name, image_file, os.path.join(person_folder, image_file)))
+    
+    results = ParallelEncoder(label="Analysis").map([image_path for _, _, image_path in jobs], model='small')
+    
+    for (person_name, image_file, _), result in zip(jobs, results):
+        by_person[person_name].append((image_file, result))
+    
+    for person_name, person_results in by_person.items():
         print(f"\nEmployee: {person_name}")
         
         valid_images = 0
-        total_images = 0
+        total_images = len(person_results)
         encodings = []
         
-        for image_file in os.listdir(person_folder):
-            if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                total_images += 1
-                image_path = os.path.join(person_folder, image_file)
-                
-                try:
-                    image = face_recognition.load_image_file(image_path)
-                    face_encodings = face_recognition.face_encodings(image)
-                    
-                    if face_encodings:
-                        valid_images += 1
-                        encodings.append(face_encodings[0])
-                        print(f"   OK: {image_file}")
-                    else:
-                        print(f"   FAIL: {image_file} - No face detected")
-                        
-                except Exception as e:
-                    print(f"   ERROR: {image_file} - {e}")
+        for image_file, result in person_results:
+            if result['error']:
+                print(f"   ERROR: {image_file} - {result['error']}")
+            elif result['encodings']:
+                valid_images += 1
+                encodings.append(result['encodings'][0])
+                print(f"   OK: {image_file}")
+            else:
+                print(f"   FAIL: {image_file} - No face detected")
         
         print(f"   Valid images: {valid_images}/{total_images}")
         
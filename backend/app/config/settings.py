@@ -14,6 +14,106 @@ class Config:
     # Face recognition settings
     FACE_RECOGNITION_THRESHOLD = 0.5
     
+    # Uploaded images are decoded at reduced resolution (JPEG DCT scaling) so their
+    # longer side is at most INGEST_MAX_DIMENSION pixels (0 = native resolution), and
+    # EXIF orientation is applied. Both change encodings, so retrain after changing them.
+    # The detection server counts faces on frames of at most INGEST_DETECTION_MAX_DIMENSION
+    INGEST_MAX_DIMENSION = 1280
+    INGEST_EXIF_TRANSPOSE = True
+    INGEST_DETECTION_MAX_DIMENSION = 640
+    
+    # Face detection runs on a copy whose longer side is at most this many pixels
+    # (0 = full resolution); encodings are still computed on the original image
+    DETECTION_MAX_DIMENSION = 800
+    DETECTION_UPSAMPLE = 1
+    
+    # Haar cascade pre-filter that rejects no-face / multi-face frames before dlib.
+    # Off by default: the cascade misses some faces dlib finds, so only enable it
+    # where captures already pass the same cascade (e.g. kiosks gated by /detect_face)
+    PREFILTER_ENABLED = False
+    PREFILTER_MAX_DIMENSION = 640
+    
+    # Live /detect_face sessions (session_id): after a full scan on a copy of at most
+    # TRACKING_MAX_DIMENSION pixels, later frames search the last face box padded by
+    # TRACKING_PADDING box widths and scaled to a ~TRACKING_FACE_SIZE px face. The whole
+    # frame is rescanned when the face is lost and every TRACKING_FULL_SCAN_INTERVAL frames
+    TRACKING_MAX_DIMENSION = 640
+    TRACKING_PADDING = 0.5
+    TRACKING_FACE_SIZE = 80
+    TRACKING_FULL_SCAN_INTERVAL = 10
+    TRACKING_SESSION_TTL = 30.0
+    TRACKING_MAX_SESSIONS = 1024
+    
+    # WebSocket frame streaming on the detection server (/stream/detect, needs flask-sock)
+    STREAM_MAX_FRAME_BYTES = 2 * 1024 * 1024
+    STREAM_PING_INTERVAL = 25
+    
+    # Optional CLAHE after the contrast/brightness lookup table (changes encodings)
+    PREPROCESS_CLAHE = False
+    
+    # Approximate nearest-neighbour search (IVF index built at training time)
+    ANN_INDEX_ENABLED = False
+    ANN_N_PROBE = 8
+    
+    # /recognize verifies the probe against expected_user's templates only; the impostor
+    # check scores a bounded set of other rows: ANN candidates ('index'), a fixed random
+    # sample of VERIFY_IMPOSTOR_SAMPLE rows ('sample') or none ('off')
+    VERIFY_EXPECTED_USER = True
+    VERIFY_IMPOSTOR_CHECK = 'index'
+    VERIFY_IMPOSTOR_SAMPLE = 256
+    
+    # Production serving: run recognition in this many pre-forked worker processes
+    # (0 = in the Flask process). Each worker queues at most SERVING_QUEUE_DEPTH
+    # requests before new ones get 503; SERVING_TIMEOUT bounds the wait in seconds
+    SERVING_WORKERS = 0
+    SERVING_QUEUE_DEPTH = 4
+    SERVING_TIMEOUT = 30.0
+    
+    # Micro-batching: group /recognize requests arriving within SCHEDULER_WINDOW_MS
+    # (up to SCHEDULER_MAX_BATCH) and score them against the gallery together.
+    # Requires SERVING_WORKERS, which encode each batch in parallel
+    SCHEDULER_ENABLED = False
+    SCHEDULER_WINDOW_MS = 10
+    SCHEDULER_MAX_BATCH = 16
+    
+    # /compare stored-photo encoding cache: LRU over an entry and byte budget,
+    # entries optionally expire after ENCODING_CACHE_TTL seconds (None = never)
+    ENCODING_CACHE_MAX_ENTRIES = 4096
+    ENCODING_CACHE_MAX_BYTES = 16 * 1024 * 1024
+    ENCODING_CACHE_TTL = None
+    
+    # Persistent SQLite layer behind the encoding cache, shared by every server
+    # process and kept across restarts (None disables it). At startup, rows for
+    # other encoder settings, rows unused for PERSISTENT_CACHE_MAX_AGE seconds and
+    # the least recently used beyond PERSISTENT_CACHE_MAX_ENTRIES are compacted away
+    PERSISTENT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'encoding_cache.sqlite3')
+    PERSISTENT_CACHE_MAX_AGE = 90 * 24 * 3600
+    PERSISTENT_CACHE_MAX_ENTRIES = 100000
+    
+    # Keep an encoding of every Firestore users photo in memory so /compare can take
+    # an employee_id instead of the stored photo. Updates arrive through a snapshot
+    # listener; the polling fallback re-reads users every EMPLOYEE_TEMPLATES_REFRESH_SECONDS
+    EMPLOYEE_TEMPLATES_ENABLED = True
+    EMPLOYEE_TEMPLATES_REFRESH_SECONDS = 300
+    
+    # Maximum number of images accepted by one /recognize_batch request
+    RECOGNIZE_BATCH_MAX_ITEMS = 32
+    
+    # Gallery condensation: near-duplicate encodings (burst shots) closer than
+    # GALLERY_DEDUP_DISTANCE are dropped, then k-medoids keeps at most
+    # GALLERY_MAX_TEMPLATES representatives per employee (0 disables either step)
+    GALLERY_MAX_TEMPLATES = 8
+    GALLERY_DEDUP_DISTANCE = 0.15
+    
+    # Compact gallery codes ('float16', 'int8' or None) for a first scoring pass;
+    # candidates are re-ranked exactly against the memory-mapped float32 rows.
+    # int8 is 4x smaller than float32 and as fast; float16 only halves memory
+    # because NumPy widens half floats slowly
+    GALLERY_QUANTIZATION = None
+    
+    # Training encoder processes (None = one per CPU core)
+    ENCODING_WORKERS = None
+    
     # Dataset path
     AI_DATASET_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'ai', 'image_dataset')
     
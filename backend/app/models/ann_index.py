@@ -0,0 +1,139 @@
+import os
+import numpy as np
+
+
+def index_path_for(model_path):
+    """ANN index file stored next to a model file"""
+    return os.path.splitext(model_path)[0] + '.ivf.npz'
+
+
+def _squared_distances(points, centroids, centroid_sq_norms):
+    """Squared distances between every point and every centroid"""
+    point_sq_norms = np.einsum('ij,ij->i', points, points)[:, None]
+    squared = point_sq_norms + centroid_sq_norms[None, :] - 2.0 * (points @ centroids.T)
+    return np.maximum(squared, 0.0, out=squared)
+
+
+class IVFIndex:
+    """Inverted-file index: a k-means coarse quantizer over gallery rows.
+
+    Each row is assigned to its nearest centroid. A search only scores the
+    rows stored in the ``n_probe`` lists whose centroids are closest to the
+    probe, so cost grows with ``N / n_lists * n_probe`` instead of ``N``.
+    """
+
+    def __init__(self, centroids, list_offsets, row_ids):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_sq_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+
+    @property
+    def n_lists(self):
+        return self.centroids.shape[0]
+
+    @property
+    def n_rows(self):
+        return self.row_ids.shape[0]
+
+    @classmethod
+    def build(cls, encodings, n_lists=None, iterations=20, max_training_rows=65536, seed=0):
+        """Cluster the encodings with Lloyd's k-means and bucket every row"""
+        data = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, 128)
+        n_rows = data.shape[0]
+        if n_rows == 0:
+            return cls(np.zeros((0, 128), dtype=np.float32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+        if n_lists is None:
+            n_lists = int(round(4 * np.sqrt(n_rows)))
+        n_lists = max(1, min(n_lists, n_rows))
+
+        rng = np.random.default_rng(seed)
+        training = data
+        if n_rows > max_training_rows:
+            training = data[rng.choice(n_rows, max_training_rows, replace=False)]
+
+        centroids = training[rng.choice(training.shape[0], n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmin(_squared_distances(training, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1)
+            counts = np.bincount(assignment, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, training)
+            non_empty = counts > 0
+            centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+        assignment = np.argmin(_squared_distances(data, centroids, np.einsum('ij,ij->i', centroids, centroids)), axis=1)
+        row_ids = np.argsort(assignment, kind='stable')
+        list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=n_lists))))
+        return cls(centroids, list_offsets, row_ids)
+
+    def candidates(self, face_encoding, n_probe):
+        """Gallery row ids stored in the ``n_probe`` lists closest to the probe"""
+        probe = np.asarray(face_encoding, dtype=np.float32)
+        n_probe = max(1, min(n_probe, self.n_lists))
+        scores = self.centroid_sq_norms - 2.0 * (self.centroids @ probe)
+        if n_probe < self.n_lists:
+            nearest = np.argpartition(scores, n_probe - 1)[:n_probe]
+        else:
+            nearest = np.arange(self.n_lists)
+        return np.concatenate([self.row_ids[self.list_offsets[i]:self.list_offsets[i + 1]] for i in nearest])
+
+    def search(self, encodings, face_encoding, k, n_probe):
+        """Approximate k nearest rows of ``encodings`` as ``(row_ids, distances)``"""
+        rows = self.candidates(face_encoding, n_probe)
+        distances = np.linalg.norm(encodings[rows] - np.asarray(face_encoding, dtype=np.float32), axis=1)
+        k = min(k, rows.shape[0])
+        if k == 0:
+            return rows[:0], distances[:0]
+        if k < rows.shape[0]:
+            top = np.argpartition(distances, k - 1)[:k]
+        else:
+            top = np.arange(rows.shape[0])
+        top = top[np.argsort(distances[top])]
+        return rows[top], distances[top]
+
+    def recall(self, encodings, queries, k=10, n_probe=8):
+        """Mean recall@k of the index against exact search for the given queries"""
+        data = np.asarray(encodings, dtype=np.float32)
+        if data.shape[0] == 0 or len(queries) == 0:
+            return 1.0
+
+        k = min(k, data.shape[0])
+        hits = 0
+        for query in queries:
+            exact = np.argpartition(np.linalg.norm(data - query, axis=1), k - 1)[:k]
+            approx, _ = self.search(data, query, k, n_probe)
+            hits += np.intersect1d(exact, approx).shape[0]
+        return hits / float(k * len(queries))
+
+    def save(self, path):
+        """Atomically persist the index as an uncompressed npz archive"""
+        temp_path = f"{path}.tmp{os.getpid()}"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, centroids=self.centroids, list_offsets=self.list_offsets, row_ids=self.row_ids)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with ``save``"""
+        with np.load(path) as data:
+            return cls(data['centroids'], data['list_offsets'], data['row_ids'])
+
+
+def build_index_report(encodings, n_probe=8, sample_size=200, jitter=0.03, seed=0):
+    """Build an index over ``encodings`` and measure its recall@10.
+
+    Queries are sampled gallery rows with Gaussian jitter added so they
+    behave like fresh captures rather than exact copies of enrolled rows.
+    """
+    index = IVFIndex.build(encodings, seed=seed)
+    data = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    if data.shape[0] == 0:
+        return index, 1.0
+
+    rng = np.random.default_rng(seed)
+    sample = data[rng.choice(data.shape[0], min(sample_size, data.shape[0]), replace=False)]
+    queries = sample + rng.normal(0.0, jitter, sample.shape).astype(np.float32)
+    return index, index.recall(data, queries, k=10, n_probe=n_probe)
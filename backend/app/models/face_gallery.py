@@ -0,0 +1,206 @@
+import numpy as np
+
+
+class FaceGallery:
+    """Known face encodings stored as one contiguous float32 matrix.
+
+    Rows are sorted by employee label so every employee owns a single
+    contiguous block of rows starting at ``offsets[label]``.
+    """
+
+    def __init__(self, encodings, labels, names, counts=None, sq_norms=None):
+        self.encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.names = list(names)
+        if counts is None:
+            counts = np.bincount(self.labels, minlength=len(self.names))
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)[:-1])).astype(np.int64) if len(self.names) else np.zeros(0, dtype=np.int64)
+        if sq_norms is None:
+            sq_norms = np.einsum('ij,ij->i', self.encodings, self.encodings)
+        self.sq_norms = np.asarray(sq_norms, dtype=np.float32)
+        self.index = None
+        # Optional QuantizedCodes for a compact first scoring pass
+        self.codes = None
+        self._label_by_name = {name.lower(): label for label, name in enumerate(self.names)}
+        self._impostor_samples = {}
+        # Distance tolerance for recognition, set by the model that installs the gallery
+        self.match_threshold = 0.5
+
+    @classmethod
+    def from_encodings(cls, encodings, names):
+        """Build a gallery from parallel lists of encodings and employee names"""
+        unique_names = list(dict.fromkeys(names))
+        if not unique_names:
+            return cls(np.zeros((0, 128), dtype=np.float32), np.zeros(0, dtype=np.int32), [])
+
+        label_of = {name: label for label, name in enumerate(unique_names)}
+        labels = np.fromiter((label_of[name] for name in names), dtype=np.int32, count=len(names))
+        order = np.argsort(labels, kind='stable')
+        matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32).reshape(-1, 128)[order])
+        return cls(matrix, labels[order], unique_names)
+
+    def __len__(self):
+        return self.encodings.shape[0]
+
+    def row_names(self):
+        """Employee name for every row, in gallery order"""
+        return [self.names[label] for label in self.labels]
+
+    def label_for(self, name):
+        """Label of an employee, matched case-insensitively, or None"""
+        return self._label_by_name.get(name.lower())
+
+    def employee_rows(self, label):
+        """Slice of the contiguous block of rows owned by one employee"""
+        start = int(self.offsets[label])
+        return slice(start, start + int(self.counts[label]))
+
+    def impostor_sample(self, size, seed=0):
+        """Fixed random subset of row ids, drawn once per gallery and size"""
+        rows = self._impostor_samples.get(size)
+        if rows is None:
+            rng = np.random.default_rng(seed)
+            rows = np.sort(rng.choice(len(self), min(size, len(self)), replace=False))
+            self._impostor_samples[size] = rows
+        return rows
+
+    def distances(self, face_encoding):
+        """Euclidean distance from one probe encoding to every row"""
+        probe = np.asarray(face_encoding, dtype=np.float32)
+        squared = self.sq_norms + np.dot(probe, probe) - 2.0 * (self.encodings @ probe)
+        return np.sqrt(np.maximum(squared, 0.0, out=squared), out=squared)
+
+    def candidate_distances(self, face_encoding, n_probe):
+        """Distances to the rows proposed by the ANN index as ``(rows, distances)``"""
+        rows = self.index.candidates(face_encoding, n_probe)
+        return rows, self.row_distances(face_encoding, rows)
+
+    def row_distances(self, face_encoding, rows):
+        """Distances from one probe to the given rows (a slice or an array of row ids)"""
+        probe = np.asarray(face_encoding, dtype=np.float32)
+        squared = self.sq_norms[rows] + np.dot(probe, probe) - 2.0 * (self.encodings[rows] @ probe)
+        return np.sqrt(np.maximum(squared, 0.0, out=squared), out=squared)
+
+    def quantized_distances(self, face_encoding, tolerance):
+        """Exact distances for the rows whose quantized distance could be within ``tolerance``.
+
+        Approximate distances are off by at most the codes' error bound, so
+        widening the cut by that bound never drops a truly matching row;
+        only the surviving rows are re-scored in float32.
+        """
+        approx = self.codes.distances(face_encoding)
+        # Small slack for float32 rounding in the approximate pass
+        rows = np.flatnonzero(approx <= tolerance + self.codes.error_bound + 1e-4)
+        return rows, self.row_distances(face_encoding, rows)
+
+    def aggregate_rows(self, rows, distances, tolerance):
+        """Per-employee aggregation over an arbitrary subset of rows"""
+        labels = self.labels[rows]
+        matched = distances <= tolerance
+        matched_sum = np.bincount(labels[matched], weights=distances[matched], minlength=len(self.names))
+        matched_count = np.bincount(labels[matched], minlength=len(self.names))
+        mean_distances = np.full(len(self.names), np.inf)
+        np.divide(matched_sum, matched_count, out=mean_distances, where=matched_count > 0)
+        min_distances = np.full(len(self.names), np.inf)
+        np.minimum.at(min_distances, labels, distances)
+        return mean_distances, min_distances
+
+    def batch_distances(self, face_encodings):
+        """Distance matrix from several probes (rows) to every gallery row, in one matrix product"""
+        probes = np.asarray(face_encodings, dtype=np.float32).reshape(-1, 128)
+        squared = self.sq_norms[None, :] + np.einsum('ij,ij->i', probes, probes)[:, None] - 2.0 * (probes @ self.encodings.T)
+        return np.sqrt(np.maximum(squared, 0.0, out=squared), out=squared)
+
+    def aggregate(self, distances, tolerance):
+        """Per-employee mean distance over matching rows and min distance over all rows.
+
+        ``distances`` is one probe's row of distances or a probes x rows matrix.
+        """
+        matched = distances <= tolerance
+        matched_sum = np.add.reduceat(np.where(matched, distances, 0.0), self.offsets, axis=-1)
+        matched_count = np.add.reduceat(matched.astype(np.int64), self.offsets, axis=-1)
+        mean_distances = np.full(matched_sum.shape, np.inf)
+        np.divide(matched_sum, matched_count, out=mean_distances, where=matched_count > 0)
+        min_distances = np.minimum.reduceat(distances, self.offsets, axis=-1)
+        return mean_distances, min_distances
+
+    def match(self, face_encoding, tolerance, use_index=False, n_probe=8, use_codes=False):
+        """Best employee by mean distance over matching encodings.
+
+        With ``use_index`` and an attached ANN index only the candidate rows
+        are scored; with ``use_codes`` and attached quantized codes the first
+        pass runs on the codes and only candidates are re-ranked exactly. Returns ``(name, mean_distance, min_distance)`` or
+        ``None`` when no encoding is within ``tolerance``.
+        """
+        if len(self) == 0:
+            return None
+
+        if use_index and self.index is not None:
+            rows, distances = self.candidate_distances(face_encoding, n_probe)
+            mean_distances, min_distances = self.aggregate_rows(rows, distances, tolerance)
+        elif use_codes and self.codes is not None:
+            rows, distances = self.quantized_distances(face_encoding, tolerance)
+            mean_distances, min_distances = self.aggregate_rows(rows, distances, tolerance)
+        else:
+            mean_distances, min_distances = self.aggregate(self.distances(face_encoding), tolerance)
+        best = int(np.argmin(mean_distances))
+        if not np.isfinite(mean_distances[best]):
+            return None
+        return self.names[best], float(mean_distances[best]), float(min_distances[best])
+
+    def match_batch(self, face_encodings, tolerance):
+        """``match`` for several probes at once, returning one result (or None) per probe"""
+        if len(self) == 0:
+            return [None] * len(face_encodings)
+
+        mean_distances, min_distances = self.aggregate(self.batch_distances(face_encodings), tolerance)
+        best = np.argmin(mean_distances, axis=1)
+        matches = []
+        for probe, label in enumerate(best):
+            if np.isfinite(mean_distances[probe, label]):
+                matches.append((self.names[label], float(mean_distances[probe, label]), float(min_distances[probe, label])))
+            else:
+                matches.append(None)
+        return matches
+
+    def verify(self, face_encoding, name, tolerance, impostor_check='index', sample_size=256, n_probe=8):
+        """1:1 verification against the claimed employee's block of rows.
+
+        Only the claimed employee's templates are scored, plus an optional
+        impostor check over a bounded set of other rows: the ANN candidates
+        (``'index'``, falling back to a fixed sample without an index), a
+        fixed random sample (``'sample'``) or nothing (``'off'``). Returns
+        ``(name, mean_distance, impostor_name)`` where ``mean_distance`` is
+        ``inf`` when no claimed template is within ``tolerance`` and
+        ``impostor_name`` is another employee who matches the probe better.
+        Returns ``None`` when ``name`` is not in the gallery.
+        """
+        label = self.label_for(name)
+        if label is None:
+            return None
+
+        distances = self.row_distances(face_encoding, self.employee_rows(label))
+        matched = distances[distances <= tolerance]
+        claimed_distance = float(matched.mean()) if matched.size else np.inf
+
+        if impostor_check == 'off':
+            return self.names[label], claimed_distance, None
+        if impostor_check == 'index' and self.index is not None:
+            rows = self.index.candidates(face_encoding, n_probe)
+        else:
+            rows = self.impostor_sample(sample_size)
+        rows = rows[self.labels[rows] != label]
+        if rows.size == 0:
+            return self.names[label], claimed_distance, None
+
+        # Aggregate over the employees present in the checked rows only
+        distances = self.row_distances(face_encoding, rows)
+        matched = distances <= tolerance
+        labels, inverse = np.unique(self.labels[rows][matched], return_inverse=True)
+        if labels.size == 0:
+            return self.names[label], claimed_distance, None
+        means = np.bincount(inverse, weights=distances[matched]) / np.bincount(inverse)
+        best = int(np.argmin(means))
+        impostor_name = self.names[labels[best]] if means[best] < claimed_distance else None
+        return self.names[label], claimed_distance, impostor_name
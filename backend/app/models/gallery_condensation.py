@@ -0,0 +1,124 @@
+import numpy as np
+from .face_gallery import FaceGallery
+
+
+def _pairwise_distances(encodings):
+    """Euclidean distance matrix between the rows of one employee's encodings"""
+    sq_norms = np.einsum('ij,ij->i', encodings, encodings)
+    squared = sq_norms[:, None] + sq_norms[None, :] - 2.0 * (encodings @ encodings.T)
+    return np.sqrt(np.maximum(squared, 0.0, out=squared), out=squared)
+
+
+def dedup_rows(distances, dedup_distance):
+    """Greedy near-duplicate removal: keep a row unless a kept row is within ``dedup_distance``"""
+    kept = []
+    for row in range(distances.shape[0]):
+        if not kept or distances[row, kept].min() > dedup_distance:
+            kept.append(row)
+    return np.asarray(kept, dtype=np.int64)
+
+
+def k_medoids(distances, k, iterations=20):
+    """Alternating k-medoids over a precomputed distance matrix, returning medoid rows.
+
+    Starts from the most central row and adds the row farthest from the
+    current medoids, so the result is deterministic for a given input.
+    """
+    n_rows = distances.shape[0]
+    if k >= n_rows:
+        return np.arange(n_rows)
+
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    while len(medoids) < k:
+        medoids.append(int(np.argmax(distances[:, medoids].min(axis=1))))
+    medoids = np.asarray(medoids, dtype=np.int64)
+
+    for _ in range(iterations):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        updated = medoids.copy()
+        for cluster in range(k):
+            members = np.flatnonzero(assignment == cluster)
+            if members.size:
+                updated[cluster] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return np.sort(medoids)
+
+
+def condense_rows(encodings, budget, dedup_distance):
+    """Row ids of the representative templates kept for one employee"""
+    encodings = np.asarray(encodings, dtype=np.float32)
+    if encodings.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    distances = _pairwise_distances(encodings)
+    kept = dedup_rows(distances, dedup_distance) if dedup_distance > 0 else np.arange(encodings.shape[0])
+    if budget and kept.shape[0] > budget:
+        kept = kept[k_medoids(distances[np.ix_(kept, kept)], budget)]
+    return kept
+
+
+def condense_gallery(gallery, budget, dedup_distance):
+    """Gallery with every employee's block reduced to at most ``budget`` templates.
+
+    Near-duplicates (burst shots) are dropped first, then k-medoids picks
+    the representatives when an employee still has more than ``budget``.
+    """
+    rows = [gallery.offsets[label] + condense_rows(gallery.encodings[gallery.employee_rows(label)], budget, dedup_distance)
+            for label in range(len(gallery.names))]
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    condensed = FaceGallery(np.ascontiguousarray(gallery.encodings[rows]), gallery.labels[rows], gallery.names,
+                            sq_norms=gallery.sq_norms[rows])
+    condensed.match_threshold = gallery.match_threshold
+    return condensed
+
+
+def condensation_report(encodings, names, budget, dedup_distance, tolerance, holdout_fraction=0.2, seed=0):
+    """Held-out recognition accuracy of the full gallery versus the condensed one.
+
+    A fixed random share of every employee's images (employees with at
+    least two) is held out as probes; both galleries are built from the
+    remaining images and must name the right employee within ``tolerance``.
+    """
+    encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+    names = list(names)
+    name_array = np.asarray(names, dtype=object)
+    rng = np.random.default_rng(seed)
+    held_out = np.zeros(len(names), dtype=bool)
+    for name in dict.fromkeys(names):
+        rows = np.flatnonzero(name_array == name)
+        if rows.shape[0] >= 2:
+            n_held = max(1, int(rows.shape[0] * holdout_fraction))
+            held_out[rng.choice(rows, n_held, replace=False)] = True
+
+    train = np.flatnonzero(~held_out)
+    full = FaceGallery.from_encodings(encodings[train], [names[row] for row in train])
+    condensed = condense_gallery(full, budget, dedup_distance)
+
+    def accuracy(gallery):
+        probes = np.flatnonzero(held_out)
+        if probes.shape[0] == 0:
+            return None
+        hits = 0
+        for row in probes:
+            match = gallery.match(encodings[row], tolerance)
+            hits += match is not None and match[0] == names[row]
+        return hits / float(probes.shape[0])
+
+    return {
+        'held_out': int(held_out.sum()),
+        'full_templates': len(full),
+        'condensed_templates': len(condensed),
+        'full_accuracy': accuracy(full),
+        'condensed_accuracy': accuracy(condensed),
+    }
+
+
+def format_condensation_report(report):
+    """One-line summary of ``condensation_report`` for training logs"""
+    if report['held_out'] == 0:
+        return "Condensation accuracy not measured: no employee has two or more images"
+    return (f"Held-out accuracy on {report['held_out']} images: "
+            f"{report['full_accuracy']:.1%} with all {report['full_templates']} templates, "
+            f"{report['condensed_accuracy']:.1%} with {report['condensed_templates']} condensed templates")
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+from .face_gallery import FaceGallery
+from .quantization import CODE_DTYPES, QuantizedCodes
+
+# On-disk layout (little endian):
+#   magic (8 bytes) | format version (uint32) | header length (uint32)
+#   JSON header: names table, per-employee row counts, block table, checksum
+#   zero padding up to a 64-byte boundary
+#   data blocks: float32 encodings (count x dim), float32 squared norms,
+#   int32 labels - rows are label-sorted so each employee is contiguous
+#   version 2 adds optional quantized codes (float16 or int8), their float32
+#   per-dimension scales and squared norms, described by header['quantization']
+# The data lives in a content-versioned file next to the model path, which
+# itself holds a small pointer (POINTER_MAGIC, newline, data file name). A live
+# server keeps the old data file mapped while the pointer is swapped, which
+# matters on Windows where a mapped file cannot be replaced.
+MAGIC = b'FRGALLRY'
+POINTER_MAGIC = b'FRGPOINT'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sII')
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _raw_bytes(array):
+    """Byte view of a C-contiguous array without copying"""
+    return array.reshape(-1).view(np.uint8)
+
+
+def _gallery_blocks(gallery):
+    """Data blocks of a gallery in file order"""
+    blocks = [
+        ('encodings', np.ascontiguousarray(gallery.encodings, dtype='<f4')),
+        ('sq_norms', np.ascontiguousarray(gallery.sq_norms, dtype='<f4')),
+        ('labels', np.ascontiguousarray(gallery.labels, dtype='<i4')),
+    ]
+    if gallery.codes is not None:
+        blocks += [
+            ('codes', np.ascontiguousarray(gallery.codes.codes, dtype=CODE_DTYPES[gallery.codes.kind])),
+            ('code_scales', np.ascontiguousarray(gallery.codes.scales, dtype='<f4')),
+            ('code_sq_norms', np.ascontiguousarray(gallery.codes.sq_norms, dtype='<f4')),
+        ]
+    return blocks
+
+
+def _write_atomically(path, write):
+    temp_path = f"{path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _remove_stale_versions(path, keep):
+    """Delete superseded data files; ones still mapped on Windows wait for the next write"""
+    directory = os.path.dirname(os.path.abspath(path))
+    prefix = os.path.basename(path) + '.'
+    for name in os.listdir(directory):
+        version = name[len(prefix):]
+        if not name.startswith(prefix) or name == os.path.basename(keep):
+            continue
+        if len(version) == 16 and set(version) <= set('0123456789abcdef'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def write_artifact(path, gallery):
+    """Write a gallery as a versioned, memory-mappable artifact and point ``path`` at it.
+
+    The data file is named after a hash of its header, so rewriting an
+    unchanged gallery reuses it. Returns the data file's path.
+    """
+    blocks = _gallery_blocks(gallery)
+    checksum = hashlib.sha256()
+    block_table = {}
+    offset = 0
+    for name, array in blocks:
+        offset = _align(offset)
+        block_table[name] = [offset, array.nbytes]
+        offset += array.nbytes
+        checksum.update(_raw_bytes(array))
+
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'dim': int(gallery.encodings.shape[1]),
+        'count': len(gallery),
+        'names': gallery.names,
+        'counts': [int(c) for c in gallery.counts],
+        'blocks': block_table,
+        'quantization': None if gallery.codes is None else {
+            'kind': gallery.codes.kind,
+            'error_bound': gallery.codes.error_bound,
+        },
+        'checksum': checksum.hexdigest(),
+    }).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header))
+
+    def write_data(f):
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in blocks:
+            block_offset = block_table[name][0]
+            f.seek(data_start + block_offset)
+            f.write(_raw_bytes(array))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data_path = f"{path}.{hashlib.sha256(header).hexdigest()[:16]}"
+    if not os.path.exists(data_path):
+        _write_atomically(data_path, write_data)
+    pointer = POINTER_MAGIC + b'\n' + os.path.basename(data_path).encode('utf-8') + b'\n'
+    _write_atomically(path, lambda f: f.write(pointer))
+    _remove_stale_versions(path, keep=data_path)
+    return data_path
+
+
+def resolve_artifact(path):
+    """Data file that ``path`` points at, or ``path`` itself when it holds the data"""
+    with open(path, 'rb') as f:
+        contents = f.read(len(POINTER_MAGIC) + 256)
+    if not contents.startswith(POINTER_MAGIC):
+        return path
+    name = contents[len(POINTER_MAGIC):].strip().decode('utf-8')
+    data_path = os.path.join(os.path.dirname(os.path.abspath(path)), name)
+    if not os.path.exists(data_path):
+        raise ValueError(f"{path} points at missing data file {name}")
+    return data_path
+
+
+def read_header(path):
+    """Read and validate the artifact header, returning ``(header, data_start)``"""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) != _PREFIX.size:
+            raise ValueError(f"{path} is not a face gallery artifact")
+        magic, version, header_length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a face gallery artifact")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses unsupported format version {version}")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    return header, _align(_PREFIX.size + header_length)
+
+
+def read_artifact(path, verify=False):
+    """Open an artifact as a FaceGallery whose arrays are read-only memory maps.
+
+    Opening only parses the header; rows are paged in on demand and shared
+    through the page cache by every process that maps the same file. Pass
+    ``verify=True`` to check the data checksum, which reads every block.
+    Quantized codes, when present, are attached as ``gallery.codes``.
+    """
+    path = resolve_artifact(path)
+    header, data_start = read_header(path)
+    dim, count = header['dim'], header['count']
+    shapes = {'encodings': (count, dim), 'sq_norms': (count,), 'labels': (count,)}
+    dtypes = {'encodings': '<f4', 'sq_norms': '<f4', 'labels': '<i4'}
+    quantization = header.get('quantization')
+    if quantization:
+        shapes.update({'codes': (count, dim), 'code_scales': (dim,), 'code_sq_norms': (count,)})
+        dtypes.update({'codes': CODE_DTYPES[quantization['kind']], 'code_scales': '<f4', 'code_sq_norms': '<f4'})
+
+    arrays = {}
+    for name, shape in shapes.items():
+        offset, nbytes = header['blocks'][name]
+        if nbytes == 0:
+            arrays[name] = np.zeros(shape, dtype=dtypes[name])
+        else:
+            arrays[name] = np.memmap(path, dtype=dtypes[name], mode='r', offset=data_start + offset, shape=shape)
+
+    if verify:
+        checksum = hashlib.sha256()
+        for name in shapes:
+            checksum.update(_raw_bytes(np.ascontiguousarray(arrays[name])))
+        if checksum.hexdigest() != header['checksum']:
+            raise ValueError(f"{path} failed checksum verification")
+
+    gallery = FaceGallery(arrays['encodings'], arrays['labels'], header['names'],
+                          counts=header['counts'], sq_norms=arrays['sq_norms'])
+    if quantization:
+        gallery.codes = QuantizedCodes(quantization['kind'], arrays['codes'], arrays['code_scales'],
+                                       arrays['code_sq_norms'], quantization['error_bound'])
+    return gallery
@@ -0,0 +1,86 @@
+import numpy as np
+
+QUANTIZATION_KINDS = ('float16', 'int8')
+CODE_DTYPES = {'float16': '<f2', 'int8': 'i1'}
+
+
+class QuantizedCodes:
+    """Compact float16 or per-dimension-scaled int8 copy of gallery rows.
+
+    Used for a first scoring pass only. ``error_bound`` is the largest
+    distance between a row and its decoded code, so by the triangle
+    inequality an approximate distance is never off by more than that.
+    """
+
+    def __init__(self, kind, codes, scales, sq_norms, error_bound):
+        if kind not in QUANTIZATION_KINDS:
+            raise ValueError(f"Unknown quantization kind {kind!r}")
+        self.kind = kind
+        self.codes = codes
+        self.scales = np.asarray(scales, dtype=np.float32)
+        self.sq_norms = np.asarray(sq_norms, dtype=np.float32)
+        self.error_bound = float(error_bound)
+
+    @classmethod
+    def encode(cls, encodings, kind):
+        """Quantize float encodings; int8 uses one scale per dimension"""
+        data = np.asarray(encodings, dtype=np.float32).reshape(-1, 128)
+        if kind == 'float16':
+            scales = np.ones(data.shape[1], dtype=np.float32)
+            codes = data.astype(CODE_DTYPES[kind])
+        elif kind == 'int8':
+            scales = (np.abs(data).max(axis=0) / 127.0).astype(np.float32) if data.shape[0] else np.ones(data.shape[1], dtype=np.float32)
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(data / scales), -127, 127).astype(CODE_DTYPES[kind])
+        else:
+            raise ValueError(f"Unknown quantization kind {kind!r}")
+
+        decoded = codes.astype(np.float32) * scales
+        sq_norms = np.einsum('ij,ij->i', decoded, decoded)
+        error_bound = float(np.linalg.norm(decoded - data, axis=1).max()) if data.shape[0] else 0.0
+        return cls(kind, codes, scales, sq_norms, error_bound)
+
+    def __len__(self):
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes + self.sq_norms.nbytes
+
+    def decode(self, rows=slice(None)):
+        """Approximate float32 encodings for the given rows"""
+        return self.codes[rows].astype(np.float32) * self.scales
+
+    def distances(self, face_encoding, chunk_rows=4096):
+        """Approximate distance from one probe to every row.
+
+        Codes are widened to float32 a chunk at a time, so the scratch
+        buffer stays cache-sized however large the gallery is.
+        """
+        probe = np.asarray(face_encoding, dtype=np.float32)
+        scaled_probe = probe * self.scales
+        dots = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), chunk_rows):
+            stop = min(start + chunk_rows, len(self))
+            dots[start:stop] = self.codes[start:stop].astype(np.float32) @ scaled_probe
+        squared = self.sq_norms + np.dot(probe, probe) - 2.0 * dots
+        return np.sqrt(np.maximum(squared, 0.0, out=squared), out=squared)
+
+    def to_document(self):
+        """Firestore-friendly representation: raw code bytes plus decoding parameters"""
+        return {
+            'kind': self.kind,
+            'dim': int(self.codes.shape[1]),
+            'codes': np.ascontiguousarray(self.codes).tobytes(),
+            'scales': [float(scale) for scale in self.scales],
+            'error_bound': self.error_bound,
+        }
+
+    @classmethod
+    def from_document(cls, document):
+        """Inverse of ``to_document``"""
+        kind = document['kind']
+        codes = np.frombuffer(document['codes'], dtype=CODE_DTYPES[kind]).reshape(-1, document['dim'])
+        scales = np.asarray(document['scales'], dtype=np.float32)
+        decoded = codes.astype(np.float32) * scales
+        return cls(kind, codes, scales, np.einsum('ij,ij->i', decoded, decoded), document['error_bound'])
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+
+
+def manifest_path_for(model_path):
+    """Training manifest stored next to a model file"""
+    return os.path.splitext(model_path)[0] + '.manifest.json'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TrainingManifest:
+    """Per-image record of content hash, encoder parameters and encodings.
+
+    Entries are keyed by the image path relative to the dataset root
+    (``person/file.jpg``), so retraining only has to encode images whose
+    content or encoder parameters changed since the last run.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+
+    def load(self):
+        """Load entries from disk, starting empty if the manifest is missing or unreadable"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable training manifest {self.path}: {e}")
+            return False
+        if data.get('version') != self.VERSION:
+            return False
+        self.entries = data.get('entries', {})
+        return True
+
+    def save(self):
+        """Atomically write the manifest with entries in sorted order"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'entries': self.entries}, f, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def lookup(self, relative_path, image_path, params):
+        """Stored entry for an image if its content and parameters are unchanged.
+
+        Size and modification time are checked first so unchanged files are
+        not re-hashed; the content hash decides when they differ.
+        """
+        entry = self.entries.get(relative_path)
+        if entry is None or entry.get('params') != params:
+            return None
+
+        stat = os.stat(image_path)
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry
+
+        if entry.get('sha256') != file_sha256(image_path):
+            return None
+        entry['size'] = stat.st_size
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return entry
+
+    def record(self, relative_path, image_path, params, encodings):
+        """Store the encodings produced for an image"""
+        stat = os.stat(image_path)
+        self.entries[relative_path] = {
+            'sha256': file_sha256(image_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'params': params,
+            'encodings': [[float(value) for value in encoding] for encoding in encodings],
+        }
+
+    def discard(self, relative_path):
+        """Forget an image, e.g. one that failed to encode, so it is encoded again next run"""
+        return self.entries.pop(relative_path, None) is not None
+
+    def prune(self, relative_paths):
+        """Drop entries for images that are no longer in the dataset"""
+        keep = set(relative_paths)
+        removed = [path for path in self.entries if path not in keep]
+        for path in removed:
+            del self.entries[path]
+        return removed
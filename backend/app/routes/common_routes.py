@@ -1,11 +1,18 @@
 from flask import jsonify
 
-def init_common_routes(app, encoding_cache=None):
+def init_common_routes(app, encoding_cache=None, prefilter=None, inference_pool=None, scheduler=None, employee_templates=None,
+                       face_tracker=None):
     
     @app.route('/health', methods=['GET'])
     def health_check():
-        cache_info = {'cache_size': len(encoding_cache)} if encoding_cache else {}
-        return jsonify({'status': 'healthy', **cache_info})
+        cache_info = {'cache_size': len(encoding_cache), 'encoding_cache': encoding_cache.stats()} if encoding_cache is not None else {}
+        prefilter_info = {'prefilter': prefilter.stats()} if prefilter else {}
+        pool_info = {'inference_pool': inference_pool.stats()} if inference_pool else {}
+        scheduler_info = {'scheduler': scheduler.stats()} if scheduler else {}
+        template_info = {'employee_templates': employee_templates.stats()} if employee_templates else {}
+        tracker_info = {'face_tracking': face_tracker.stats()} if face_tracker else {}
+        return jsonify({'status': 'healthy', **cache_info, **prefilter_info, **pool_info, **scheduler_info,
+                        **template_info, **tracker_info})
 
     @app.route('/', methods=['GET'])
     def home():
@@ -1,36 +1,50 @@
 import cv2
-import numpy as np
-from flask import request, jsonify
-import base64
-import io
-from PIL import Image
+from flask import jsonify
+from ..utils.request_images import read_request_images
+from ..utils.image_ingest import ingest_image
+from ..utils.metrics import OUTCOMES, StageTimer
+from ..config.settings import Config
 
-def init_detection_routes(app):
+def init_detection_routes(app, face_tracker=None):
     face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml') # type: ignore
 
     @app.route('/detect_face', methods=['POST'])
     def detect_face():
+        """Count the faces in a frame
+        
+        Live previews pass a session_id: the face found in the session's
+        previous frame is then tracked in a small region instead of
+        scanning the whole frame.
+        """
         try:
-            data = request.get_json()
+            # JSON with a base64 image, a multipart upload or a raw JPEG/PNG body
+            images, params = read_request_images('image')
 
-            if not data or 'image' not in data:
+            if 'image' not in images:
                 return jsonify({'error': 'No image provided'}), 400
 
-            image_data = data['image'].split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            gray = cv2.cvtColor(opencv_image, cv2.COLOR_BGR2GRAY)
+            # Straight to grayscale at reduced resolution; face counting only needs luminance
+            try:
+                gray, scale = ingest_image(images['image'], Config.INGEST_DETECTION_MAX_DIMENSION, mode='L')
+            except ValueError:
+                return jsonify({'error': 'Could not decode image data'}), 400
 
-            faces = face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=1.1, 
-                minNeighbors=5, 
-                minSize=(60, 60)
-            )
+            session_id = params.get('session_id')
+            if session_id and face_tracker is not None:
+                faces, full_scan = face_tracker.detect(session_id, gray, scale)
+            else:
+                # 60px minimum face in the uploaded image, never below the 24px cascade window
+                min_size = max(24, int(60 * scale))
+                with StageTimer('cascade_detection'):
+                    faces = face_cascade.detectMultiScale(
+                        gray, 
+                        scaleFactor=1.1, 
+                        minNeighbors=5, 
+                        minSize=(min_size, min_size)
+                    )
 
             face_count = len(faces)
+            OUTCOMES.inc('detect', 'no_face' if face_count == 0 else 'multiple_faces' if face_count > 1 else 'one_face')
             
             if face_count == 0:
                 return jsonify({
@@ -47,11 +61,21 @@ def init_detection_routes(app):
                     'face_count': face_count
                 })
             else:
-                return jsonify({
+                result = {
                     'success': True,
                     'face_detected': True,
                     'face_count': 1
-                })
+                }
+                if session_id and face_tracker is not None:
+                    result['face_box'] = [int(value / scale) for value in faces[0]]
+                    result['tracking'] = 'full' if full_scan else 'roi'
+                return jsonify(result)
         
         except Exception as e:
-            return jsonify({'error': str(e)}), 500
\ No newline at end of file
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/detect_face/session/<session_id>', methods=['DELETE'])
+    def end_detection_session(session_id):
+        """Forget a live-preview session's tracked face"""
+        ended = face_tracker.end(session_id) if face_tracker is not None else False
+        return jsonify({'success': ended})
\ No newline at end of file
@@ -1,61 +1,143 @@
 from flask import request, jsonify
-import os
-import base64
-import tempfile
 import face_recognition
-from ..utils.image_utils import get_face_encoding_from_base64, create_cache_key
-from ..services.firebase_service import FirebaseService
+from ..utils.image_utils import get_face_encoding_from_bytes, create_cache_key
+from ..utils.request_images import decode_item_image, read_request_image_items, read_request_images
+from ..services.training_jobs import TrainingJobManager
+from ..services.inference_pool import PoolBusy
+from ..utils.metrics import OUTCOMES
+from ..config.settings import Config
 
-def init_face_routes(app, face_model, encoding_cache):
-    firebase_service = FirebaseService()
+# STRICT stored-photo threshold to prevent cross-employee fraud
+COMPARE_THRESHOLD = 0.45
+
+def _detection_result(face_count, boxes):
+    """The /detect_face response for a frame, plus the ``(top, right, bottom, left)`` boxes in the decoded image"""
+    result = {'success': face_count == 1, 'face_detected': face_count > 0, 'face_count': face_count,
+              'faces': [list(box) for box in boxes]}
+    if face_count == 0:
+        result.update({'error_type': 'no_face', 'message': 'No face detected'})
+    elif face_count > 1:
+        result.update({'error_type': 'multiple_faces', 'message': 'Multiple faces detected. Only one person allowed.'})
+    return result
+
+def init_face_routes(app, face_model, encoding_cache, inference_pool=None, scheduler=None, employee_templates=None):
+    # Recognition goes through the micro-batching scheduler and/or the pre-forked workers when configured
+    recognizer = scheduler or inference_pool or face_model
+    # Stored-photo comparisons run their dlib detection and encoding in the workers too
+    encoder = inference_pool or face_model
+    training_jobs = TrainingJobManager(face_model, on_success=inference_pool.reload_model if inference_pool else None)
     
     @app.route('/recognize', methods=['POST'])
     def recognize_face():
-        """Recognize face with mandatory user validation for attendance restriction"""
+        """Recognize face with mandatory user validation for attendance restriction
+        
+        Accepts JSON with a base64 image, a multipart upload or a raw
+        JPEG/PNG body (expected_user then goes in the query string).
+        """
         try:
-            data = request.get_json()
+            images, params = read_request_images('image')
             
-            if 'image' not in data:
+            if 'image' not in images:
                 return jsonify({'error': 'No image provided'}), 400
             
             # SECURITY: expected_user is now mandatory for attendance system
-            expected_user = data.get('expected_user')
+            expected_user = params.get('expected_user')
             if not expected_user:
                 return jsonify({
                     'error': 'Expected user must be specified for attendance validation'
                 }), 400
             
-            # Decode base64 image
-            image_data = data['image'].split(',')[1]  # Remove data:image/jpeg;base64, prefix
-            image_bytes = base64.b64decode(image_data)
+            # Encoded bytes are decoded in memory by the model - no temp file on the hot path
+            name, message = recognizer.recognize_face(images['image'], expected_user)
+            
+            if name:
+                return jsonify({
+                    'success': True,
+                    'name': name,
+                    'message': message,
+                    'validated_user': expected_user
+                })
+            else:
+                return jsonify({
+                    'success': False,
+                    'message': message,
+                    'expected_user': expected_user
+                })
+        
+        except PoolBusy as e:
+            return jsonify({'error': str(e)}), 503
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/recognize_batch', methods=['POST'])
+    def recognize_batch():
+        """Recognize several captures in one request, each validated against its expected user
+        
+        Accepts JSON ``items`` or a multipart body repeating ``image`` and
+        ``expected_user`` once per item.
+        """
+        try:
+            items = read_request_image_items()
+            
+            if not items:
+                return jsonify({'error': 'No items provided'}), 400
             
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                temp_file.write(image_bytes)
-                temp_path = temp_file.name
+            if len(items) > Config.RECOGNIZE_BATCH_MAX_ITEMS:
+                return jsonify({
+                    'error': f'At most {Config.RECOGNIZE_BATCH_MAX_ITEMS} items per batch'
+                }), 400
             
-            try:
-                # Recognize face with mandatory expected user validation
-                name, message = face_model.recognize_face(temp_path, expected_user)
+            results = [None] * len(items)
+            valid = []
+            for index, (item_image, expected_user) in enumerate(items):
+                if item_image is None:
+                    results[index] = {'index': index, 'success': False, 'error': 'No image provided'}
+                    continue
                 
+                # SECURITY: every item must name the employee it is taking attendance for
+                if not expected_user:
+                    results[index] = {
+                        'index': index,
+                        'success': False,
+                        'error': 'Expected user must be specified for attendance validation'
+                    }
+                    continue
+                
+                try:
+                    image = decode_item_image(item_image)
+                except Exception as e:
+                    results[index] = {'index': index, 'success': False, 'error': f'Invalid image: {e}', 'expected_user': expected_user}
+                    continue
+                valid.append((index, image, expected_user))
+            
+            # Decode, encode and score the images against the gallery together
+            recognized = recognizer.recognize_batch([image for _, image, _ in valid],
+                                                   [expected_user for _, _, expected_user in valid])
+            for (index, _, expected_user), (name, message) in zip(valid, recognized):
                 if name:
-                    return jsonify({
+                    results[index] = {
+                        'index': index,
                         'success': True,
                         'name': name,
                         'message': message,
                         'validated_user': expected_user
-                    })
+                    }
                 else:
-                    return jsonify({
+                    results[index] = {
+                        'index': index,
                         'success': False,
                         'message': message,
                         'expected_user': expected_user
-                    })
+                    }
             
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_path)
+            return jsonify({
+                'results': results,
+                'count': len(results),
+                'recognized': sum(1 for result in results if result['success'])
+            })
         
+        except PoolBusy as e:
+            return jsonify({'error': str(e)}), 503
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -63,21 +145,47 @@ def init_face_routes(app, face_model, encoding_cache):
     def compare_faces():
         if request.method == 'OPTIONS':
             return '', 200
-        """Compare captured face with specific user's stored photo - used for attendance restriction"""
+        """Compare captured face with specific user's stored photo - used for attendance restriction
+        
+        The stored photo is either sent as image2 or named by employee_id
+        (Firestore document id or numericId), which uses the server's
+        precomputed template and needs only the capture in the request.
+        """
         try:
-            data = request.get_json()
+            # JSON, multipart (image1/image2 files) or a raw body for image1 only
+            images, params = read_request_images('image1', 'image2')
+            employee_id = params.get('employee_id')
             
-            if 'image1' not in data or 'image2' not in data:
-                return jsonify({'error': 'Two images required'}), 400
+            if 'image1' not in images or ('image2' not in images and not employee_id):
+                return jsonify({'error': 'Two images, or image1 and employee_id, required'}), 400
             
-            # Create cache keys for stored images (image2 is usually the stored user photo)
-            image2_hash = create_cache_key(data['image2'])
+            template = None
+            if 'image2' not in images:
+                template = employee_templates.get(employee_id) if employee_templates is not None else None
+                if template is None:
+                    return jsonify({'error': f'No stored photo template for employee {employee_id}'}), 404
+            
+            # Empty and crowded captures are rejected by the prefilter before the dlib pipeline
+            error_type, face_count, face1_encoding = encoder.encode_capture(images['image1'])
+            if error_type:
+                OUTCOMES.inc('compare', error_type)
+                return jsonify({
+                    'match': False,
+                    'error_type': error_type,
+                    'face_count': face_count,
+                    'message': 'No face detected in captured image' if error_type == 'no_face' else 'Multiple faces detected in captured image'
+                })
             
-            # Get encodings with caching for stored image
-            face1_encoding = get_face_encoding_from_base64(data['image1'])
-            face2_encoding = get_face_encoding_from_base64(data['image2'], cache_key=image2_hash, encoding_cache=encoding_cache)
+            if template is not None:
+                face2_encoding = template['encoding']
+            else:
+                # Cache stored-photo encodings (image2 is usually the stored user photo) by content hash
+                image2_hash = create_cache_key(images['image2'])
+                face2_encoding = get_face_encoding_from_bytes(images['image2'], cache_key=image2_hash, encoding_cache=encoding_cache,
+                                                              encode=encoder.encode_photo)
             
             if face1_encoding is None or face2_encoding is None:
+                OUTCOMES.inc('compare', 'no_face')
                 return jsonify({
                     'match': False,
                     'message': 'No face detected in one or both images'
@@ -86,31 +194,135 @@ def init_face_routes(app, face_model, encoding_cache):
             # Calculate distance (lower = more similar)
             distance = face_recognition.face_distance([face2_encoding], face1_encoding)[0]
             
-            # STRICT threshold to prevent cross-employee fraud
-            threshold = 0.45
+            threshold = COMPARE_THRESHOLD
             match = distance < threshold
+            OUTCOMES.inc('compare', 'matched' if match else 'not_matched')
             
-            return jsonify({
+            result = {
                 'match': bool(match),
                 'distance': float(distance),
                 'threshold': float(threshold),
                 'message': 'Faces match' if match else 'Faces do not match'
-            })
+            }
+            if template is not None:
+                result['employee_id'] = template['id']
+                result['employee_name'] = template['name']
+            return jsonify(result)
+            
+        except PoolBusy as e:
+            return jsonify({'error': str(e)}), 503
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/detect_and_recognize', methods=['POST', 'OPTIONS'])
+    def detect_and_recognize():
+        if request.method == 'OPTIONS':
+            return '', 200
+        """Face detection and recognition of one capture in a single call
+        
+        The frame is decoded and detected once, and the detected box is
+        reused for the face-count check and for encoding. With employee_id
+        the face is compared with that employee's stored-photo template as
+        /compare does; otherwise it is recognized against the gallery and
+        validated against expected_user as /recognize does.
+        """
+        try:
+            images, params = read_request_images('image')
+            
+            if 'image' not in images:
+                return jsonify({'error': 'No image provided'}), 400
             
+            employee_id = params.get('employee_id')
+            expected_user = params.get('expected_user')
+            if not employee_id and not expected_user:
+                return jsonify({
+                    'error': 'employee_id or expected_user must be specified for attendance validation'
+                }), 400
+            
+            if employee_id:
+                template = employee_templates.get(employee_id) if employee_templates is not None else None
+                if template is None:
+                    return jsonify({'error': f'No stored photo template for employee {employee_id}'}), 404
+                
+                # The box is found and encoded with the same encoder as the stored-photo templates
+                locations, encoding = encoder.detect_and_encode(images['image'])
+                detection = _detection_result(len(locations), locations)
+                if not detection['success']:
+                    OUTCOMES.inc('compare', detection['error_type'])
+                    return jsonify({'success': False, 'detection': detection, 'recognition': None})
+                
+                if template['encoding'] is None:
+                    OUTCOMES.inc('compare', 'no_face')
+                    recognition = {'match': False, 'message': 'No face detected in one or both images'}
+                else:
+                    distance = face_recognition.face_distance([template['encoding']], encoding)[0]
+                    match = distance < COMPARE_THRESHOLD
+                    OUTCOMES.inc('compare', 'matched' if match else 'not_matched')
+                    recognition = {
+                        'match': bool(match),
+                        'distance': float(distance),
+                        'threshold': float(COMPARE_THRESHOLD),
+                        'message': 'Faces match' if match else 'Faces do not match'
+                    }
+                recognition.update({'employee_id': template['id'], 'employee_name': template['name']})
+                return jsonify({'success': recognition['match'], 'detection': detection, 'recognition': recognition})
+            
+            # Runs in one inference worker when the pool is enabled, so it still decodes only once
+            if inference_pool is not None:
+                face_count, boxes, name, message = inference_pool.call('detect_and_recognize', images['image'], expected_user)
+            else:
+                face_count, boxes, name, message = face_model.detect_and_recognize(images['image'], expected_user)
+            detection = _detection_result(face_count, boxes)
+            if not detection['success']:
+                return jsonify({'success': False, 'detection': detection, 'recognition': None})
+            
+            recognition = {'success': bool(name), 'message': message}
+            if name:
+                recognition.update({'name': name, 'validated_user': expected_user})
+            else:
+                recognition['expected_user'] = expected_user
+            return jsonify({'success': bool(name), 'detection': detection, 'recognition': recognition})
+        
+        except PoolBusy as e:
+            return jsonify({'error': str(e)}), 503
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/retrain', methods=['POST'])
     def retrain_model():
+        """Start retraining in the background; poll /retrain/<job_id> for progress"""
         try:
-            face_model.train_model()
-            return jsonify({'success': True, 'message': 'Model retrained successfully'})
+            job, started = training_jobs.start()
+            if not started:
+                return jsonify({
+                    'success': False,
+                    'message': 'A retraining job is already running',
+                    'job': job.to_dict()
+                }), 409
+            return jsonify({
+                'success': True,
+                'message': 'Retraining started',
+                'job': job.to_dict(),
+                'status_url': f"/retrain/{job.job_id}"
+            }), 202
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/retrain/<job_id>', methods=['GET'])
+    def retrain_status(job_id):
+        job = training_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown retraining job'}), 404
+        return jsonify(job.to_dict())
+
+    @app.route('/retrain/<job_id>/cancel', methods=['POST'])
+    def retrain_cancel(job_id):
+        if not training_jobs.cancel(job_id):
+            return jsonify({'error': 'Job not found or already finished'}), 404
+        return jsonify({'success': True, 'job': training_jobs.get(job_id).to_dict()})
+
     @app.route('/clear-cache', methods=['POST'])
     def clear_cache():
         """Clear the encoding cache to free memory"""
-        cache_size = len(encoding_cache)
-        encoding_cache.clear()
+        cache_size = encoding_cache.clear()
         return jsonify({'message': f'Cache cleared. Removed {cache_size} entries'})
\ No newline at end of file
@@ -0,0 +1,74 @@
+import time
+from flask import Response, g, request
+from ..utils.metrics import METRICS, REQUEST_SECONDS
+
+def _stat_samples(stats, fields, labels=None):
+    return [(labels or {}, stats[field]) for field in fields if stats.get(field) is not None]
+
+def init_metrics_routes(app, encoding_cache=None, inference_pool=None, face_tracker=None):
+    """Prometheus /metrics with per-request timing plus the counters components already keep"""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_time(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, request.method, str(response.status_code))
+        return response
+
+    if encoding_cache is not None:
+        def encoding_cache_metrics():
+            stats = encoding_cache.stats()
+            metrics = [
+                ('encoding_cache_requests_total', 'counter', 'Encoding cache lookups by result',
+                 [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])]),
+                ('encoding_cache_evictions_total', 'counter', 'Entries dropped for the size budgets',
+                 _stat_samples(stats, ['evictions'])),
+                ('encoding_cache_expirations_total', 'counter', 'Entries dropped for the TTL',
+                 _stat_samples(stats, ['expirations'])),
+                ('encoding_cache_entries', 'gauge', 'Encodings held in memory', _stat_samples(stats, ['entries'])),
+                ('encoding_cache_bytes', 'gauge', 'Approximate memory held by the cache', _stat_samples(stats, ['bytes'])),
+            ]
+            persistent = stats.get('persistent')
+            if persistent:
+                metrics.append(('persistent_encoding_cache_requests_total', 'counter', 'Persistent cache lookups by result',
+                                [({'result': 'hit'}, persistent['hits']), ({'result': 'miss'}, persistent['misses'])]))
+                metrics.append(('persistent_encoding_cache_writes_total', 'counter', 'Encodings written to the persistent cache',
+                                _stat_samples(persistent, ['writes'])))
+            return metrics
+        METRICS.add_collector(encoding_cache_metrics)
+
+    if inference_pool is not None:
+        def inference_pool_metrics():
+            stats = inference_pool.stats()
+            return [
+                ('inference_pool_completed_total', 'counter', 'Calls completed by the inference workers',
+                 _stat_samples(stats, ['completed'])),
+                ('inference_pool_rejected_total', 'counter', 'Calls refused because every worker was busy',
+                 _stat_samples(stats, ['rejected_busy'])),
+                ('inference_pool_restarts_total', 'counter', 'Workers forked again after exiting',
+                 _stat_samples(stats, ['restarts'])),
+                ('inference_pool_pending', 'gauge', 'Calls queued or running per worker',
+                 [({'worker': str(worker)}, pending) for worker, pending in enumerate(stats['pending'])]),
+            ]
+        METRICS.add_collector(inference_pool_metrics)
+
+    if face_tracker is not None:
+        def face_tracker_metrics():
+            stats = face_tracker.stats()
+            return [
+                ('face_tracking_frames_total', 'counter', 'Tracked frames by scan kind',
+                 [({'scan': 'full'}, stats['full_scans']), ({'scan': 'roi'}, stats['roi_scans'])]),
+                ('face_tracking_lost_total', 'counter', 'Region scans that lost the face',
+                 _stat_samples(stats, ['lost'])),
+                ('face_tracking_sessions', 'gauge', 'Live detection sessions', _stat_samples(stats, ['sessions'])),
+            ]
+        METRICS.add_collector(face_tracker_metrics)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,25 @@
+from ..services.frame_stream import FrameStream
+from ..config.settings import Config
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+def init_stream_routes(app, face_tracker):
+    if Sock is None:
+        print("flask-sock not installed - WebSocket frame streaming (/stream/detect) disabled")
+        return False
+
+    app.config['SOCK_SERVER_OPTIONS'] = {
+        'ping_interval': Config.STREAM_PING_INTERVAL,
+        'max_message_size': Config.STREAM_MAX_FRAME_BYTES,
+    }
+    sock = Sock(app)
+
+    @sock.route('/stream/detect')
+    def stream_detect(ws):
+        """Binary JPEG/PNG frames in, one compact JSON detection result out per processed frame"""
+        FrameStream(ws.receive, ws.send, face_tracker).run()
+
+    return True
@@ -9,8 +9,17 @@ sys.path.insert(0, ai_path)
 from ai.face_recognition_model import FaceRecognitionModel
 
 from .config.settings import Config
+from .utils.face_detection import CascadePrefilter
+from .services.inference_pool import InferencePool
+from .services.batch_scheduler import MicroBatchScheduler
+from .services.encoding_cache import EncodingCache
+from .services.persistent_encoding_cache import PersistentEncodingCache
+from .services.employee_templates import EmployeeTemplateStore
+from .services.firebase_service import FirebaseService
+from .utils.image_utils import compare_encoder_params
 from .routes.face_routes import init_face_routes
 from .routes.common_routes import init_common_routes
+from .routes.metrics_routes import init_metrics_routes
 
 def create_app(enhanced=False):
     app = Flask(__name__)
@@ -22,17 +31,60 @@ def create_app(enhanced=False):
     
     # Initialize the face recognition model
     face_model = FaceRecognitionModel(Config.AI_DATASET_PATH)
+    face_model.use_ann_index = Config.ANN_INDEX_ENABLED
+    face_model.ann_n_probe = Config.ANN_N_PROBE
+    face_model.encoding_workers = Config.ENCODING_WORKERS
+    face_model.use_clahe = Config.PREPROCESS_CLAHE
+    face_model.verify_expected_user = Config.VERIFY_EXPECTED_USER
+    face_model.impostor_check = Config.VERIFY_IMPOSTOR_CHECK
+    face_model.impostor_sample_size = Config.VERIFY_IMPOSTOR_SAMPLE
+    face_model.max_templates = Config.GALLERY_MAX_TEMPLATES
+    face_model.dedup_distance = Config.GALLERY_DEDUP_DISTANCE
+    face_model.quantization = Config.GALLERY_QUANTIZATION
+    face_model.prefilter = CascadePrefilter() if Config.PREFILTER_ENABLED else None
     
     # Load or train the model
     if not face_model.load_model():
         print("No existing model found. Training new model...")
         face_model.train_model()
     
-    # Cache for storing face encodings
-    encoding_cache = {}
+    # Fork recognition workers only after the model is loaded so they share it
+    inference_pool = None
+    if Config.SERVING_WORKERS:
+        inference_pool = InferencePool(face_model, Config.SERVING_WORKERS, Config.SERVING_QUEUE_DEPTH, Config.SERVING_TIMEOUT)
+        if not inference_pool.start():
+            inference_pool = None
+    
+    # Batching only pays off when the pool encodes a batch in parallel
+    scheduler = None
+    if Config.SCHEDULER_ENABLED and inference_pool is None:
+        print("Micro-batching needs SERVING_WORKERS; serving requests unbatched")
+    elif Config.SCHEDULER_ENABLED:
+        scheduler = MicroBatchScheduler(face_model, inference_pool, Config.SCHEDULER_WINDOW_MS,
+                                        Config.SCHEDULER_MAX_BATCH, Config.SERVING_TIMEOUT)
+    
+    # Bounded LRU cache for stored-photo encodings, backed by the on-disk store
+    persistent_cache = None
+    if Config.PERSISTENT_CACHE_PATH:
+        persistent_cache = PersistentEncodingCache(Config.PERSISTENT_CACHE_PATH, compare_encoder_params())
+        removed = persistent_cache.compact(Config.PERSISTENT_CACHE_MAX_AGE, Config.PERSISTENT_CACHE_MAX_ENTRIES)
+        print(f"Persistent encoding cache: {len(persistent_cache)} entries ({removed} compacted)")
+    encoding_cache = EncodingCache(Config.ENCODING_CACHE_MAX_ENTRIES, Config.ENCODING_CACHE_MAX_BYTES,
+                                   Config.ENCODING_CACHE_TTL, backing=persistent_cache)
+    
+    # Stored-photo templates for /compare by employee id; the Firestore listener is
+    # opened after the workers are forked since its threads do not survive a fork
+    employee_templates = None
+    if Config.EMPLOYEE_TEMPLATES_ENABLED:
+        employee_templates = EmployeeTemplateStore(FirebaseService(), encoding_cache, Config.EMPLOYEE_TEMPLATES_REFRESH_SECONDS)
+        if not employee_templates.start():
+            employee_templates = None
     
     # Initialize routes
-    init_face_routes(app, face_model, encoding_cache)
-    init_common_routes(app, encoding_cache if enhanced else None)
+    init_face_routes(app, face_model, encoding_cache, inference_pool=inference_pool, scheduler=scheduler,
+                     employee_templates=employee_templates)
+    init_common_routes(app, encoding_cache if enhanced else None, prefilter=face_model.prefilter,
+                       inference_pool=inference_pool, scheduler=scheduler, employee_templates=employee_templates)
+    init_metrics_routes(app, encoding_cache, inference_pool=inference_pool)
     
     return app, face_model, encoding_cache
\ No newline at end of file
@@ -0,0 +1,139 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import numpy as np
+from .inference_pool import PoolBusy
+from ..utils.metrics import STAGE_SECONDS
+
+
+class _PendingRequest:
+    def __init__(self, image, expected_user):
+        self.image = image
+        self.expected_user = expected_user
+        self.enqueued_at = time.perf_counter()
+        self.future = Future()
+
+
+class MicroBatchScheduler:
+    """Groups concurrent recognition requests into batches in front of a FaceRecognitionModel.
+
+    The first request of a batch waits at most ``window_ms`` for others to
+    arrive (or until ``max_batch`` are queued). The batch is encoded
+    across the inference pool, then every probe is scored against the
+    gallery in one matrix product and each waiting request gets its own
+    result. Without a pool the encodes run one after another on the
+    scheduler thread, which only adds the window to every request, so
+    create_app enables batching only alongside the inference pool.
+    """
+
+    def __init__(self, face_model, inference_pool=None, window_ms=10, max_batch=16, timeout=30.0, history=1000):
+        self.face_model = face_model
+        self.inference_pool = inference_pool
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.batched_requests = 0
+        self.batch_sizes = collections.Counter()
+        self.queue_waits = collections.deque(maxlen=history)
+        threading.Thread(target=self._run, name="micro-batch-scheduler", daemon=True).start()
+
+    def submit(self, image, expected_user=None):
+        """Queue one recognition request and return a Future for its ``(name, message)``"""
+        request = _PendingRequest(image, expected_user)
+        self.requests.put(request)
+        return request.future
+
+    def recognize_face(self, image, expected_user=None):
+        return self.submit(image, expected_user).result(self.timeout)
+
+    def recognize_batch(self, images, expected_users):
+        futures = [self.submit(image, expected_user) for image, expected_user in zip(images, expected_users)]
+        return [future.result(self.timeout) for future in futures]
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full.
+
+        Requests already queued are always taken, so a backlog drains in
+        full batches even when its window has long passed.
+        """
+        batch = [self.requests.get()]
+        deadline = batch[0].enqueued_at + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _encode(self, batch):
+        """``(encoding, error)`` per request, spread across the inference pool when available"""
+        futures = []
+        for request in batch:
+            future = None
+            if self.inference_pool is not None:
+                try:
+                    future = self.inference_pool.submit('try_encode_probe', request.image)
+                except PoolBusy:
+                    pass
+            futures.append(future)
+
+        # Requests the pool could not take are encoded here while the workers run
+        return [self._encode_one(request, future) for request, future in zip(batch, futures)]
+
+    def _encode_one(self, request, future):
+        """``(encoding, error)`` for one request; a timeout or failure only affects that request"""
+        try:
+            if future is not None:
+                return future.result(self.timeout)
+            return self.face_model.try_encode_probe(request.image)
+        except FutureTimeout:
+            return None, "Timed out waiting for an inference worker"
+        except Exception as e:
+            return None, f"Failed to process image: {e}"
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            with self.lock:
+                self.batches += 1
+                self.batched_requests += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.queue_waits.extend(started - request.enqueued_at for request in batch)
+            for request in batch:
+                STAGE_SECONDS.observe(started - request.enqueued_at, 'batch_queue_wait')
+
+            try:
+                results = self.face_model.score_batch(self._encode(batch), [request.expected_user for request in batch])
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    def stats(self):
+        """Batch-size and queue-wait metrics for tuning the window and batch size"""
+        with self.lock:
+            waits_ms = np.array(self.queue_waits) * 1000.0
+            return {
+                'window_ms': self.window * 1000.0,
+                'max_batch': self.max_batch,
+                'batches': self.batches,
+                'requests': self.batched_requests,
+                'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+                'batch_sizes': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                'queue_wait_ms': {
+                    'mean': float(waits_ms.mean()) if waits_ms.size else 0.0,
+                    'p50': float(np.percentile(waits_ms, 50)) if waits_ms.size else 0.0,
+                    'p95': float(np.percentile(waits_ms, 95)) if waits_ms.size else 0.0,
+                    'max': float(waits_ms.max()) if waits_ms.size else 0.0,
+                },
+                'pending': self.requests.qsize(),
+            }
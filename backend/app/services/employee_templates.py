@@ -0,0 +1,145 @@
+import threading
+import time
+from ..utils.image_utils import create_cache_key, decode_base64_image, get_face_encoding_from_bytes
+from ..utils.metrics import StageTimer
+
+
+class EmployeeTemplateStore:
+    """Encodings of every Firestore ``users`` photo, held in memory for /compare.
+
+    Templates are looked up by document id or ``numericId``. A snapshot
+    listener on the collection keeps them current: a user's photo is only
+    re-encoded when the digest of its ``image`` bytes changes, and removed
+    users are dropped. Where the listener cannot be opened the collection
+    is re-read every ``refresh_interval`` seconds instead. Encodings go
+    through the shared encoding cache, so a restart re-encodes nothing
+    already seen.
+    """
+
+    def __init__(self, firebase_service, encoding_cache=None, refresh_interval=300.0):
+        self.firebase_service = firebase_service
+        self.encoding_cache = encoding_cache
+        self.refresh_interval = refresh_interval
+        self.templates = {}
+        self.numeric_ids = {}
+        self.mode = None
+        self.watch = None
+        self.encoded = 0
+        self.failed = 0
+        self.last_update = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Load the templates and keep them current; returns False when Firebase is unavailable"""
+        if not self.firebase_service.firebase_enabled or self.firebase_service.db is None:
+            print("Employee templates disabled - Firebase unavailable")
+            return False
+
+        users = self.firebase_service.db.collection('users')
+        try:
+            self.watch = users.on_snapshot(self._on_snapshot)
+            self.mode = 'listener'
+        except Exception as e:
+            print(f"Firestore listener unavailable ({e}); polling users every {self.refresh_interval:.0f}s")
+            self.mode = 'polling'
+            threading.Thread(target=self._poll, name="employee-templates", daemon=True).start()
+        return True
+
+    def _on_snapshot(self, snapshot, changes, read_time):
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                self._remove(change.document.id)
+            else:
+                self._update(change.document.id, change.document.to_dict())
+
+    def _poll(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing employee templates: {e}")
+            time.sleep(self.refresh_interval)
+
+    def refresh(self):
+        """Re-read the whole collection, encoding changed photos and dropping removed users"""
+        seen = set()
+        with StageTimer('firestore'):
+            docs = self.firebase_service.db.collection('users').get()
+        for doc in docs:
+            seen.add(doc.id)
+            self._update(doc.id, doc.to_dict())
+        with self.lock:
+            removed = [doc_id for doc_id in self.templates if doc_id not in seen]
+        for doc_id in removed:
+            self._remove(doc_id)
+
+    def _update(self, doc_id, data):
+        image = data.get('image')
+        if not image:
+            self._remove(doc_id)
+            return
+
+        try:
+            image_bytes = decode_base64_image(image)
+            digest = create_cache_key(image_bytes)
+            with self.lock:
+                current = self.templates.get(doc_id)
+            if current is not None and current['digest'] == digest:
+                encoding = current['encoding']
+            else:
+                # None when the stored photo has no detectable face; /compare reports that as before
+                encoding = get_face_encoding_from_bytes(image_bytes, cache_key=digest, encoding_cache=self.encoding_cache)
+                self.encoded += 1
+        except Exception as e:
+            print(f"Error encoding stored photo of {doc_id}: {e}")
+            self.failed += 1
+            self._remove(doc_id)
+            return
+
+        numeric_id = data.get('numericId')
+        template = {'id': doc_id, 'name': data.get('name'), 'numeric_id': numeric_id,
+                    'digest': digest, 'encoding': encoding}
+        with self.lock:
+            self._unlink(doc_id)
+            self.templates[doc_id] = template
+            if numeric_id is not None:
+                self.numeric_ids[str(numeric_id)] = doc_id
+            self.last_update = time.time()
+
+    def _unlink(self, doc_id):
+        previous = self.templates.pop(doc_id, None)
+        if previous is not None and previous['numeric_id'] is not None:
+            if self.numeric_ids.get(str(previous['numeric_id'])) == doc_id:
+                del self.numeric_ids[str(previous['numeric_id'])]
+
+    def _remove(self, doc_id):
+        with self.lock:
+            self._unlink(doc_id)
+            self.last_update = time.time()
+
+    def get(self, employee_id):
+        """Template of a user by document id or numericId, or None"""
+        employee_id = str(employee_id)
+        with self.lock:
+            template = self.templates.get(employee_id)
+            if template is None and employee_id in self.numeric_ids:
+                template = self.templates.get(self.numeric_ids[employee_id])
+            return template
+
+    def __len__(self):
+        return len(self.templates)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'mode': self.mode,
+                'employees': len(self.templates),
+                'with_face': sum(1 for template in self.templates.values() if template['encoding'] is not None),
+                'encoded': self.encoded,
+                'failed': self.failed,
+                'last_update': self.last_update,
+            }
+
+    def close(self):
+        if self.watch is not None:
+            self.watch.unsubscribe()
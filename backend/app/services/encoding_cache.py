@@ -0,0 +1,107 @@
+import collections
+import sys
+import threading
+import time
+
+
+class EncodingCache:
+    """Thread-safe LRU cache of face encodings with entry and byte budgets.
+
+    Entries older than ``ttl`` seconds (when set) are dropped on access.
+    Hits, misses, evictions and expirations are counted for ``/health``.
+    An optional ``backing`` store (e.g. PersistentEncodingCache) is read on
+    memory misses and written through on every put.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=None, ttl=None, backing=None):
+        self.backing = backing
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(key, encoding):
+        return sys.getsizeof(key) + getattr(encoding, 'nbytes', sys.getsizeof(encoding))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _drop(self, key):
+        _, _, size = self.entries.pop(key)
+        self.nbytes -= size
+
+    def get(self, key):
+        """Cached encoding for ``key`` or None, refreshing its LRU position"""
+        encoding = self._get_memory(key)
+        if encoding is None and self.backing is not None:
+            encoding = self.backing.get(key)
+            if encoding is not None:
+                self._put_memory(key, encoding)
+        return encoding
+
+    def _get_memory(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            encoding, stored_at, _ = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return encoding
+
+    def put(self, key, encoding):
+        """Store an encoding, evicting least recently used entries beyond the budgets"""
+        self._put_memory(key, encoding)
+        if self.backing is not None:
+            self.backing.put(key, encoding)
+
+    def _put_memory(self, key, encoding):
+        size = self._entry_size(key, encoding)
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (encoding, time.monotonic(), size)
+            self.nbytes += size
+            while self.entries and (len(self.entries) > self.max_entries or
+                                    (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every in-memory entry, returning how many were removed (the backing store is kept)"""
+        with self.lock:
+            removed = len(self.entries)
+            self.entries.clear()
+            self.nbytes = 0
+            return removed
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            backing_info = {'persistent': self.backing.stats()} if self.backing is not None else {}
+            return {
+                'entries': len(self.entries),
+                'bytes': self.nbytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                **backing_info,
+            }
@@ -0,0 +1,134 @@
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+import face_recognition
+from ..utils.image_utils import preprocess_image_file
+from ..utils.image_ingest import ingest_rgb
+from ..utils.face_detection import compute_encodings, detect_face_locations
+
+
+class EncodingCancelled(Exception):
+    """Raised by ParallelEncoder.map when its cancel event is set"""
+
+
+def init_worker():
+    """Warm up dlib in a worker process so the first task pays no model-load cost"""
+    # One worker per core: keep OpenCV from spawning its own thread pool
+    cv2.setNumThreads(1)
+    face_recognition.face_encodings(np.zeros((64, 64, 3), dtype=np.uint8))
+
+
+def encode_image(source, model='large', preprocess=False, clahe=False, stats=False):
+    """Load one image (path or raw bytes) and return its face encodings.
+
+    Returns a dict with ``encodings``, ``face_count`` and, with ``stats``,
+    the image size and mean brightness.
+    Errors are reported in ``error`` instead of being raised so one bad file
+    does not abort a whole batch.
+    """
+    result = {'encodings': [], 'face_count': 0, 'error': None}
+    try:
+        image_source = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        if preprocess:
+            image = preprocess_image_file(image_source, clahe=clahe)
+        else:
+            image = ingest_rgb(image_source)
+
+        # Detect once on a downscaled copy, encode on the full-resolution image
+        locations = detect_face_locations(image)
+        encodings = compute_encodings(image, locations, model=model) if locations else []
+
+        result['encodings'] = encodings
+        result['face_count'] = len(encodings)
+        if stats:
+            result['height'], result['width'] = image.shape[:2]
+            result['brightness'] = float(np.mean(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)))
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _start_method():
+    """Pick the multiprocessing start method for a new encoding pool.
+
+    fork shares the already-imported modules but is only safe from a
+    single-threaded process such as the training scripts. A server retraining
+    in the background already runs the Firestore listener, the scheduler and
+    request threads, so its workers come from a clean forkserver instead.
+    Windows only has spawn.
+    """
+    if not sys.platform.startswith('linux'):
+        return 'spawn'
+    return 'fork' if threading.active_count() == 1 else 'forkserver'
+
+
+def _encode_task(task):
+    source, options = task
+    return encode_image(source, **options)
+
+
+class ParallelEncoder:
+    """Encode many images across a process pool.
+
+    Each worker loads the dlib models once, work is handed out in chunks and
+    results come back in submission order. Progress and throughput are
+    printed while the pool runs.
+    """
+
+    def __init__(self, workers=None, chunksize=None, label="Encoding"):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.label = label
+
+    def map(self, sources, progress_callback=None, cancel_event=None, **options):
+        """Encode every source with ``encode_image(source, **options)``, preserving order.
+
+        ``progress_callback(done, total)`` is called after every result and the
+        pool is torn down with EncodingCancelled once ``cancel_event`` is set.
+        """
+        sources = list(sources)
+        total = len(sources)
+        if total == 0:
+            return []
+
+        workers = min(self.workers, total)
+        chunksize = self.chunksize or max(1, total // (workers * 4))
+        tasks = [(source, options) for source in sources]
+        start = time.perf_counter()
+        report_every = max(1, total // 20)
+        results = []
+
+        if workers == 1:
+            iterator = map(_encode_task, tasks)
+            pool = None
+        else:
+            context = multiprocessing.get_context(_start_method())
+            if context.get_start_method() == 'forkserver':
+                # Import dlib once in the fork server rather than in every worker
+                context.set_forkserver_preload([__name__])
+            pool = context.Pool(workers, initializer=init_worker)
+            iterator = pool.imap(_encode_task, tasks, chunksize=chunksize)
+
+        try:
+            for result in iterator:
+                results.append(result)
+                done = len(results)
+                if progress_callback is not None:
+                    progress_callback(done, total)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise EncodingCancelled(f"{self.label} cancelled after {done}/{total} images")
+                if done % report_every == 0 or done == total:
+                    elapsed = time.perf_counter() - start
+                    print(f"  {self.label}: {done}/{total} images ({done / elapsed:.1f} img/s)")
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        elapsed = time.perf_counter() - start
+        print(f"{self.label}: {total} images in {elapsed:.1f}s on {workers} worker(s) ({total / elapsed:.1f} img/s)")
+        return results
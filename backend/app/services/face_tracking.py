@@ -0,0 +1,150 @@
+import collections
+import threading
+import time
+import cv2
+from ..utils.metrics import StageTimer
+
+
+class _Session:
+    def __init__(self):
+        self.box = None
+        self.frames_since_scan = 0
+        self.last_seen = time.monotonic()
+
+
+class FaceTracker:
+    """Haar cascade face detection for live frames that remembers the face per client session.
+
+    A session's first frame is scanned whole on a copy downscaled to
+    ``max_dimension``. Later frames only search the last face box padded
+    by ``padding`` box widths, scaled so the face is about
+    ``track_face_size`` pixels wide. When the face is lost there, the same
+    frame falls back to a full scan. A full scan is also forced every
+    ``full_scan_interval`` frames, so a second person entering outside the
+    region is noticed. Sessions idle for ``session_ttl`` seconds are
+    forgotten, and at most ``max_sessions`` are kept.
+    """
+
+    def __init__(self, max_dimension=640, padding=0.5, track_face_size=80, full_scan_interval=10,
+                 session_ttl=30.0, max_sessions=1024, scale_factor=1.1, min_neighbors=5, min_face_size=60):
+        self.max_dimension = max_dimension
+        self.padding = padding
+        self.track_face_size = track_face_size
+        self.full_scan_interval = full_scan_interval
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_face_size = min_face_size
+        self.sessions = collections.OrderedDict()
+        # CascadeClassifier is not safe to share between request threads
+        self._local = threading.local()
+        self.lock = threading.Lock()
+        self.frames = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.lost = 0
+
+    def _cascade(self):
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml') # type: ignore
+            self._local.cascade = cascade
+        return cascade
+
+    def _scan(self, gray, scale, frame_scale, offset_x=0, offset_y=0, min_size=0):
+        """Cascade boxes in ``gray`` resized by ``scale``, as ``(x, y, w, h)`` in frame coordinates"""
+        if scale < 1.0:
+            height, width = gray.shape[:2]
+            gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+
+        # Keep the full-resolution minimum face size, but never below the 24px cascade window
+        min_size = max(24, int(self.min_face_size * frame_scale * scale), min_size)
+        with StageTimer('cascade_detection'):
+            faces = self._cascade().detectMultiScale(
+                gray,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=(min_size, min_size)
+            )
+        return [(int(x / scale) + offset_x, int(y / scale) + offset_y, int(w / scale), int(h / scale))
+                for x, y, w, h in faces]
+
+    def _full_scan(self, gray, frame_scale):
+        height, width = gray.shape[:2]
+        scale = 1.0
+        if self.max_dimension and max(height, width) > self.max_dimension:
+            scale = self.max_dimension / float(max(height, width))
+        return self._scan(gray, scale, frame_scale)
+
+    def _roi_scan(self, gray, box, frame_scale):
+        x, y, w, h = box
+        pad_x, pad_y = int(w * self.padding), int(h * self.padding)
+        height, width = gray.shape[:2]
+        left, top = max(0, x - pad_x), max(0, y - pad_y)
+        right, bottom = min(width, x + w + pad_x), min(height, y + h + pad_y)
+        # Faces smaller than track_face_size are scanned as they are, never upscaled
+        scale = min(1.0, self.track_face_size / float(w))
+        # A tracked face cannot shrink to half its size between frames, so smaller windows are skipped
+        return self._scan(gray[top:bottom, left:right], scale, frame_scale, left, top, min_size=int(w * scale) // 2)
+
+    def _session(self, session_id):
+        now = time.monotonic()
+        with self.lock:
+            while self.sessions:
+                oldest_id, oldest = next(iter(self.sessions.items()))
+                if len(self.sessions) < self.max_sessions and now - oldest.last_seen <= self.session_ttl:
+                    break
+                del self.sessions[oldest_id]
+            session = self.sessions.pop(session_id, None) or _Session()
+            session.last_seen = now
+            self.sessions[session_id] = session
+            return session
+
+    def detect(self, session_id, gray, frame_scale=1.0):
+        """Face boxes ``(x, y, w, h)`` in a grayscale frame and whether they came from a full scan
+
+        ``frame_scale`` is the frame's size relative to the capture (when it
+        was decoded at reduced resolution), so ``min_face_size`` keeps
+        meaning capture pixels.
+        """
+        session = self._session(session_id)
+        faces = None
+        full_scan = False
+        if session.box is not None and session.frames_since_scan < self.full_scan_interval:
+            faces = self._roi_scan(gray, session.box, frame_scale)
+            session.frames_since_scan += 1
+            if not faces:
+                faces = None
+                with self.lock:
+                    self.lost += 1
+        if faces is None:
+            faces = self._full_scan(gray, frame_scale)
+            session.frames_since_scan = 0
+            full_scan = True
+
+        # Only a single face is followed; otherwise the next frame scans the whole frame again
+        session.box = faces[0] if len(faces) == 1 else None
+        with self.lock:
+            self.frames += 1
+            if full_scan:
+                self.full_scans += 1
+            else:
+                self.roi_scans += 1
+        return faces, full_scan
+
+    def end(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def stats(self):
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'frames': self.frames,
+                'full_scans': self.full_scans,
+                'roi_scans': self.roi_scans,
+                'lost': self.lost,
+            }
@@ -3,9 +3,12 @@ from firebase_admin import credentials, firestore, storage
 import base64
 import face_recognition
 import numpy as np
-from PIL import Image
-import io
 from datetime import datetime
+from ..config.settings import Config
+from ..models.gallery_condensation import condense_rows
+from ..models.quantization import QuantizedCodes
+from ..utils.image_ingest import ingest_rgb
+from ..utils.metrics import StageTimer
 
 class FirebaseService:
     def __init__(self):
@@ -42,7 +45,8 @@ class FirebaseService:
             # Query users collection by name
             users_ref = self.db.collection('users')
             query = users_ref.where('name', '==', employee_name)
-            docs = query.get()
+            with StageTimer('firestore'):
+                docs = query.get()
             
             if docs:
                 for doc in docs:
@@ -61,12 +65,16 @@ class FirebaseService:
         try:
             users_ref = self.db.collection('users')
             query = users_ref.where('name', '==', employee_name)
-            docs = query.get()
+            with StageTimer('firestore'):
+                docs = query.get()
             
             if docs:
                 for doc in docs:
                     data = doc.to_dict()
                     encodings_data = data.get('face_encodings')
+                    if isinstance(encodings_data, dict):
+                        # Quantized codes written by store_employee_encodings
+                        return list(QuantizedCodes.from_document(encodings_data).decode())
                     if encodings_data:
                         return [np.array(enc) for enc in encodings_data]
             return None
@@ -75,20 +83,30 @@ class FirebaseService:
             return None
     
     def store_employee_encodings(self, employee_name, encodings_list):
-        """Store multiple face encodings for employee in Firebase"""
+        """Store face encodings for employee in Firebase, condensed to the per-employee template budget
+        
+        With ``Config.GALLERY_QUANTIZATION`` set the field holds quantized
+        codes instead of float lists; get_employee_encodings reads both.
+        """
         if not self.firebase_enabled or self.db is None:
             return False
             
         try:
             users_ref = self.db.collection('users')
             query = users_ref.where('name', '==', employee_name)
-            docs = query.get()
+            with StageTimer('firestore'):
+                docs = query.get()
             
-            encodings_data = [enc.tolist() for enc in encodings_list]
+            kept = condense_rows(encodings_list, Config.GALLERY_MAX_TEMPLATES, Config.GALLERY_DEDUP_DISTANCE) if len(encodings_list) else []
+            if Config.GALLERY_QUANTIZATION and len(kept):
+                encodings_data = QuantizedCodes.encode([encodings_list[row] for row in kept], Config.GALLERY_QUANTIZATION).to_document()
+            else:
+                encodings_data = [np.asarray(encodings_list[row]).tolist() for row in kept]
             
             if docs:
                 for doc in docs:
-                    doc.reference.update({'face_encodings': encodings_data})
+                    with StageTimer('firestore'):
+                        doc.reference.update({'face_encodings': encodings_data})
                     return True
             return False
         except Exception as e:
@@ -110,10 +128,7 @@ class FirebaseService:
             image_data = firebase_image_data.split(',')[1] if ',' in firebase_image_data else firebase_image_data
             image_bytes = base64.b64decode(image_data)
             
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            image_array = np.array(image)
+            image_array = ingest_rgb(image_bytes)
             
             # Get face encoding from Firebase image
             firebase_encodings = face_recognition.face_encodings(image_array)
@@ -161,10 +176,7 @@ class FirebaseService:
             image_data = firebase_image_data.split(',')[1] if ',' in firebase_image_data else firebase_image_data
             image_bytes = base64.b64decode(image_data)
             
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            image_array = np.array(image)
+            image_array = ingest_rgb(image_bytes)
             
             # Get face encoding from Firebase image
             firebase_encodings = face_recognition.face_encodings(image_array)
@@ -193,7 +205,8 @@ class FirebaseService:
             today = datetime.now().strftime('%Y-%m-%d')
             attendance_ref = self.db.collection('attendance')
             query = attendance_ref.where('userId', '==', employee_id).where('date', '==', today)
-            docs = query.get()
+            with StageTimer('firestore'):
+                docs = query.get()
             
             if docs:
                 return True, "Attendance already taken today"
@@ -220,7 +233,8 @@ class FirebaseService:
                 'timestamp': datetime.now()
             }
             
-            self.db.collection('attendance').add(attendance_data)
+            with StageTimer('firestore'):
+                self.db.collection('attendance').add(attendance_data)
             return True, "Attendance recorded successfully"
             
         except Exception as e:
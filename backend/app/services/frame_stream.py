@@ -0,0 +1,86 @@
+import json
+import threading
+import uuid
+from ..utils.image_ingest import ingest_image
+from ..utils.metrics import OUTCOMES
+from ..config.settings import Config
+
+
+class FrameStream:
+    """Live face detection over one streaming connection, always on the freshest frame.
+
+    A reader thread keeps receiving binary JPEG/PNG frames. A frame that
+    arrives while the detector is busy replaces the one waiting, which is
+    dropped, so a client sending faster than frames can be processed sees
+    results for its latest frame instead of a growing backlog. The
+    connection is one FaceTracker session.
+    """
+
+    def __init__(self, receive, send, face_tracker):
+        self.receive = receive
+        self.send = send
+        self.face_tracker = face_tracker
+        self.session_id = f"stream-{uuid.uuid4().hex}"
+        self.condition = threading.Condition()
+        self.frame = None
+        self.frame_number = 0
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def _read(self):
+        try:
+            while True:
+                message = self.receive()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    # Only binary frames are processed
+                    continue
+                with self.condition:
+                    if self.frame is not None:
+                        self.dropped += 1
+                    self.received += 1
+                    self.frame = message
+                    self.frame_number = self.received
+                    self.condition.notify()
+        except Exception:
+            pass
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify()
+
+    def detect(self, frame, frame_number, dropped):
+        """Compact detection result for one encoded frame"""
+        try:
+            gray, scale = ingest_image(frame, Config.INGEST_DETECTION_MAX_DIMENSION, mode='L')
+        except ValueError:
+            return {'frame': frame_number, 'error': 'Could not decode image data'}
+
+        faces, full_scan = self.face_tracker.detect(self.session_id, gray, scale)
+        result = {'frame': frame_number, 'face_count': len(faces), 'tracking': 'full' if full_scan else 'roi',
+                  'dropped': dropped}
+        if len(faces) == 1:
+            # In the coordinates of the frame as sent
+            result['face_box'] = [int(value / scale) for value in faces[0]]
+        else:
+            result['error_type'] = 'no_face' if not faces else 'multiple_faces'
+        OUTCOMES.inc('stream', result.get('error_type', 'one_face'))
+        return result
+
+    def run(self):
+        """Serve the connection until the client closes it"""
+        threading.Thread(target=self._read, name=f"{self.session_id}-reader", daemon=True).start()
+        try:
+            while True:
+                with self.condition:
+                    while self.frame is None and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        break
+                    frame, frame_number, dropped = self.frame, self.frame_number, self.dropped
+                    self.frame = None
+                self.send(json.dumps(self.detect(frame, frame_number, dropped), separators=(',', ':')))
+        finally:
+            self.face_tracker.end(self.session_id)
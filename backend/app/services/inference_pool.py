@@ -0,0 +1,195 @@
+import atexit
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+from concurrent.futures import Future
+from .encoding_pool import init_worker
+from ..utils.metrics import METRICS
+
+
+class PoolBusy(Exception):
+    """Raised when every worker already has ``queue_depth`` requests outstanding"""
+
+
+def _worker_main(worker_id, tasks, results, face_model):
+    """Serve recognition calls on one pinned core until a ``None`` task arrives"""
+    if hasattr(os, 'sched_setaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[worker_id % len(cores)]})
+    init_worker()
+    # Drop the metrics inherited from the parent; each result carries what the call recorded
+    METRICS.drain()
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, method, args = task
+        try:
+            result, error = getattr(face_model, method)(*args), None
+        except Exception as e:
+            result, error = None, str(e)
+        results.put((task_id, result, error, METRICS.drain()))
+
+
+class InferencePool:
+    """Pre-forked worker processes running ``FaceRecognitionModel`` calls.
+
+    Workers are forked after the model is loaded, so they share the gallery
+    copy-on-write (memory-mapped galleries are shared through the page
+    cache). Each worker is pinned to one core with one OpenCV thread and
+    has its own task queue; a request goes to the least loaded worker and
+    is refused with PoolBusy once every worker has ``queue_depth`` pending.
+    A worker that exits fails the calls it was holding and is forked again.
+    """
+
+    def __init__(self, face_model, workers=None, queue_depth=4, timeout=30.0):
+        self.face_model = face_model
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.context = None
+        self.processes = [None] * self.workers
+        self.task_queues = [None] * self.workers
+        self.results = None
+        self.pending = [0] * self.workers
+        self.futures = {}
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.closing = False
+        self.lock = threading.Lock()
+        self.task_ids = itertools.count()
+
+    def start(self):
+        """Fork the workers; returns False where fork is unavailable (the caller serves in-process)"""
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            print("Inference pool needs fork; serving recognition in-process")
+            return False
+
+        self.context = multiprocessing.get_context('fork')
+        self.results = self.context.Queue()
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+
+        threading.Thread(target=self._collect_results, name="inference-results", daemon=True).start()
+        threading.Thread(target=self._watch_workers, name="inference-watchdog", daemon=True).start()
+        # Stop the watchdog before multiprocessing terminates the workers at exit
+        atexit.register(self.close)
+        print(f"Inference pool started with {self.workers} worker(s), queue depth {self.queue_depth}")
+        return True
+
+    def _spawn(self, worker_id):
+        # Forked from the current parent, so a replacement starts with the live model
+        tasks = self.context.Queue()
+        process = self.context.Process(target=_worker_main, args=(worker_id, tasks, self.results, self.face_model),
+                                       name=f"inference-{worker_id}", daemon=True)
+        process.start()
+        self.task_queues[worker_id] = tasks
+        self.processes[worker_id] = process
+
+    def _watch_workers(self):
+        while not self.closing:
+            with self.lock:
+                sentinels = {process.sentinel: worker_id for worker_id, process in enumerate(self.processes)}
+            for sentinel in multiprocessing.connection.wait(list(sentinels), timeout=1.0):
+                if not self.closing:
+                    self._restart(sentinels[sentinel])
+
+    def _restart(self, worker_id):
+        """Fail the calls held by an exited worker, release their slots and fork a replacement"""
+        with self.lock:
+            process = self.processes[worker_id]
+            process.join(0)
+            lost = [task_id for task_id, (_, owner) in self.futures.items() if owner == worker_id]
+            futures = [self.futures.pop(task_id)[0] for task_id in lost]
+            self.pending[worker_id] = 0
+            self.restarts += 1
+            # Tasks still queued for the dead worker were failed above
+            self.task_queues[worker_id].cancel_join_thread()
+            self._spawn(worker_id)
+        print(f"Inference worker {worker_id} exited with code {process.exitcode}; "
+              f"failed {len(futures)} call(s) and started a replacement")
+        for future in futures:
+            future.set_exception(RuntimeError(f"Recognition worker {worker_id} exited while handling the request"))
+
+    def _collect_results(self):
+        while True:
+            task_id, result, error, metrics = self.results.get()
+            METRICS.merge(metrics)
+            with self.lock:
+                entry = self.futures.pop(task_id, None)
+                if entry is not None:
+                    future, worker_id = entry
+                    self.pending[worker_id] -= 1
+                    self.completed += 1
+            if entry is None:
+                # Already failed when its worker exited
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _send(self, worker_id, method, args):
+        future = Future()
+        task_id = next(self.task_ids)
+        self.futures[task_id] = (future, worker_id)
+        self.pending[worker_id] += 1
+        self.task_queues[worker_id].put((task_id, method, args))
+        return future
+
+    def submit(self, method, *args):
+        """Queue ``face_model.<method>(*args)`` on the least loaded worker and return a Future"""
+        with self.lock:
+            worker_id = min(range(self.workers), key=self.pending.__getitem__)
+            if self.pending[worker_id] >= self.queue_depth:
+                self.rejected += 1
+                raise PoolBusy("All recognition workers are busy. Please try again.")
+            return self._send(worker_id, method, args)
+
+    def call(self, method, *args):
+        return self.submit(method, *args).result(self.timeout)
+
+    def recognize_face(self, image, expected_user=None):
+        return self.call('recognize_face', image, expected_user)
+
+    def recognize_batch(self, images, expected_users):
+        return self.call('recognize_batch', images, expected_users)
+
+    def encode_capture(self, image):
+        return self.call('encode_capture', image)
+
+    def encode_photo(self, image):
+        return self.call('encode_photo', image)
+
+    def detect_and_encode(self, image):
+        return self.call('detect_and_encode', image)
+
+    def reload_model(self):
+        """Make every worker reload the saved model, e.g. after retraining"""
+        with self.lock:
+            futures = [self._send(worker_id, 'load_model', ()) for worker_id in range(self.workers)]
+        return all(future.result(self.timeout) for future in futures)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue_depth,
+                'pending': list(self.pending),
+                'completed': self.completed,
+                'rejected_busy': self.rejected,
+                'restarts': self.restarts,
+            }
+
+    def close(self):
+        if self.closing or self.context is None:
+            return
+        self.closing = True
+        for tasks in self.task_queues:
+            tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
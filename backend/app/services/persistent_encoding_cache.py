@@ -0,0 +1,114 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+class PersistentEncodingCache:
+    """SQLite store of face encodings keyed by image content hash plus encoder parameters.
+
+    Every server process on a host opens the same file; WAL mode lets
+    readers run alongside one writer and a busy timeout serialises
+    concurrent writes. Rows written with other encoder parameters are
+    never returned and are removed by ``compact``.
+    """
+
+    # Refresh last_used at most this often per row so hits rarely write
+    TOUCH_INTERVAL = 3600.0
+
+    def __init__(self, path, params, timeout=30.0):
+        self.path = path
+        self.params = json.dumps(params, sort_keys=True)
+        self.timeout = timeout
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS encodings ("
+                "key TEXT NOT NULL, params TEXT NOT NULL, encoding BLOB NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (key, params))"
+            )
+
+    def _connection(self):
+        """One connection per thread (and per process, as connections must not cross a fork)"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        """Stored encoding for ``key`` under the current encoder parameters, or None"""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT encoding, last_used FROM encodings WHERE key = ? AND params = ?", (key, self.params)
+        ).fetchone()
+        with self.lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        encoding, last_used = row
+        now = time.time()
+        if now - last_used > self.TOUCH_INTERVAL:
+            with connection:
+                connection.execute("UPDATE encodings SET last_used = ? WHERE key = ? AND params = ?", (now, key, self.params))
+        return np.frombuffer(encoding, dtype=np.float64).copy()
+
+    def put(self, key, encoding):
+        """Insert or replace the encoding stored for ``key``"""
+        now = time.time()
+        blob = np.ascontiguousarray(encoding, dtype=np.float64).tobytes()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO encodings (key, params, encoding, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, self.params, blob, now, now)
+            )
+        with self.lock:
+            self.writes += 1
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM encodings WHERE params = ?", (self.params,)).fetchone()[0]
+
+    def compact(self, max_age=None, max_entries=None):
+        """Drop rows for other encoder parameters, rows unused for ``max_age`` seconds and the
+        least recently used rows beyond ``max_entries``, then reclaim the space.
+
+        Returns the number of rows removed.
+        """
+        connection = self._connection()
+        with connection:
+            removed = connection.execute("DELETE FROM encodings WHERE params != ?", (self.params,)).rowcount
+            if max_age is not None:
+                removed += connection.execute("DELETE FROM encodings WHERE last_used < ?", (time.time() - max_age,)).rowcount
+            if max_entries is not None:
+                removed += connection.execute(
+                    "DELETE FROM encodings WHERE rowid NOT IN (SELECT rowid FROM encodings ORDER BY last_used DESC LIMIT ?)",
+                    (max_entries,)
+                ).rowcount
+        if removed:
+            connection.execute("VACUUM")
+        return removed
+
+    def stats(self):
+        with self.lock:
+            return {
+                'path': self.path,
+                'entries': len(self),
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+            }
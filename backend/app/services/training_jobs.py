@@ -0,0 +1,112 @@
+import threading
+import time
+import uuid
+from .encoding_pool import EncodingCancelled
+
+
+class TrainingJob:
+    """State of one background retraining run"""
+
+    def __init__(self):
+        self.job_id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.processed = 0
+        self.total = 0
+        self.message = 'Waiting to start'
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'processed': self.processed,
+            'total': self.total,
+            'progress': self.processed / self.total if self.total else (1.0 if self.status == 'succeeded' else 0.0),
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class TrainingJobManager:
+    """Runs ``face_model.train_model`` on a background thread, one job at a time.
+
+    ``train_model`` builds the new gallery off to the side and swaps it in
+    with a single assignment, so recognition keeps serving the old model
+    until the new one is complete.
+    """
+
+    def __init__(self, face_model, max_history=20, on_success=None):
+        self.face_model = face_model
+        # Called after a successful run, e.g. to reload the model in serving workers
+        self.on_success = on_success
+        self.max_history = max_history
+        self.jobs = {}
+        self.active_job = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start a retraining job, returning ``(job, started)``.
+
+        When a job is already running it is returned with ``started=False``.
+        """
+        with self.lock:
+            if self.active_job is not None and not self.active_job.finished:
+                return self.active_job, False
+
+            job = TrainingJob()
+            self.jobs[job.job_id] = job
+            self.active_job = job
+            self._trim_history()
+
+        threading.Thread(target=self._run, args=(job,), name=f"retrain-{job.job_id[:8]}", daemon=True).start()
+        return job, True
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Request cancellation; returns False for unknown or already finished jobs"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        job.message = 'Cancellation requested'
+        return True
+
+    def _run(self, job):
+        job.status = 'running'
+        job.message = 'Encoding new and changed images'
+
+        def on_progress(done, total):
+            job.processed = done
+            job.total = total
+
+        try:
+            self.face_model.train_model(progress_callback=on_progress, cancel_event=job.cancel_event)
+            if self.on_success is not None:
+                self.on_success()
+            job.status = 'succeeded'
+            job.message = f"Model retrained with {len(self.face_model.gallery)} face encodings"
+        except EncodingCancelled as e:
+            job.status = 'cancelled'
+            job.message = str(e)
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            job.message = 'Retraining failed'
+        finally:
+            job.finished_at = time.time()
+
+    def _trim_history(self):
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, len(self.jobs) - self.max_history)]:
+            del self.jobs[job.job_id]
@@ -0,0 +1,132 @@
+import threading
+import cv2
+import face_recognition
+from ..config.settings import Config
+from .metrics import StageTimer
+
+
+def detect_face_locations(image, max_dimension=None, upsample=None):
+    """HOG face boxes found on a downscaled copy, mapped back to full-resolution coordinates.
+
+    ``max_dimension`` caps the longer side of the copy used for detection
+    (0 disables downscaling); boxes are ``(top, right, bottom, left)`` in the
+    coordinates of ``image``.
+    """
+    if max_dimension is None:
+        max_dimension = Config.DETECTION_MAX_DIMENSION
+    if upsample is None:
+        upsample = Config.DETECTION_UPSAMPLE
+
+    height, width = image.shape[:2]
+    scale = 1.0
+    if max_dimension and max(height, width) > max_dimension:
+        scale = max_dimension / float(max(height, width))
+        small = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    else:
+        small = image
+
+    with StageTimer('detection'):
+        locations = face_recognition.face_locations(small, number_of_times_to_upsample=upsample)
+    if scale == 1.0:
+        return locations
+
+    return [
+        (max(0, int(top / scale)), min(width, int(round(right / scale))),
+         min(height, int(round(bottom / scale))), max(0, int(left / scale)))
+        for top, right, bottom, left in locations
+    ]
+
+
+def encode_faces(image, model='large', max_dimension=None, upsample=None):
+    """Detect faces on a downscaled copy and encode them on the original image"""
+    locations = detect_face_locations(image, max_dimension=max_dimension, upsample=upsample)
+    if not locations:
+        return []
+    return compute_encodings(image, locations, model=model)
+
+
+def compute_encodings(image, locations, model='large'):
+    """Encodings of already located faces, timed as the encoding stage"""
+    with StageTimer('encoding'):
+        return face_recognition.face_encodings(image, known_face_locations=locations, model=model)
+
+
+def detection_params(max_dimension=None, upsample=None):
+    """Detection settings that affect the encodings, for training manifests"""
+    return {
+        'max_dimension': Config.DETECTION_MAX_DIMENSION if max_dimension is None else max_dimension,
+        'upsample': Config.DETECTION_UPSAMPLE if upsample is None else upsample,
+    }
+
+
+class CascadePrefilter:
+    """Cheap Haar cascade face count used to reject frames before the dlib pipeline.
+
+    Runs on a small grayscale copy; frames with no face or several faces are
+    rejected without paying for HOG detection and the ResNet encoder.
+    """
+
+    def __init__(self, max_dimension=None, scale_factor=1.1, min_neighbors=5, min_face_size=60):
+        self.max_dimension = Config.PREFILTER_MAX_DIMENSION if max_dimension is None else max_dimension
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_face_size = min_face_size
+        # CascadeClassifier is not safe to share between request threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected_no_face = 0
+        self.rejected_multiple_faces = 0
+
+    def _cascade(self):
+        cascade = getattr(self._local, 'cascade', None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml') # type: ignore
+            self._local.cascade = cascade
+        return cascade
+
+    def count_faces(self, image):
+        """Number of cascade detections on a downscaled grayscale copy of an RGB image"""
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        height, width = gray.shape[:2]
+        scale = 1.0
+        if self.max_dimension and max(height, width) > self.max_dimension:
+            scale = self.max_dimension / float(max(height, width))
+            gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+        # Keep the full-resolution minimum face size, but never below the 24px cascade window
+        min_size = max(24, int(self.min_face_size * scale))
+        with StageTimer('prefilter'):
+            faces = self._cascade().detectMultiScale(
+                gray,
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=(min_size, min_size)
+            )
+        return len(faces)
+
+    def check(self, image):
+        """Return ``(error_type, face_count)``; ``error_type`` is None when the frame may proceed"""
+        face_count = self.count_faces(image)
+        error_type = None
+        if face_count == 0:
+            error_type = 'no_face'
+        elif face_count > 1:
+            error_type = 'multiple_faces'
+
+        with self._lock:
+            self.checked += 1
+            if error_type == 'no_face':
+                self.rejected_no_face += 1
+            elif error_type == 'multiple_faces':
+                self.rejected_multiple_faces += 1
+        return error_type, face_count
+
+    def stats(self):
+        rejected = self.rejected_no_face + self.rejected_multiple_faces
+        return {
+            'checked': self.checked,
+            'rejected_no_face': self.rejected_no_face,
+            'rejected_multiple_faces': self.rejected_multiple_faces,
+            'encodes_saved': rejected,
+        }
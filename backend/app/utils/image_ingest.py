@@ -0,0 +1,64 @@
+import io
+import math
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from ..config.settings import Config
+from .metrics import StageTimer
+
+
+def ingest_params(max_dimension=None):
+    """Ingest settings that affect the encodings, for training manifests and encoding caches"""
+    return {
+        'max_dimension': Config.INGEST_MAX_DIMENSION if max_dimension is None else max_dimension,
+        'exif_transpose': Config.INGEST_EXIF_TRANSPOSE,
+    }
+
+
+def ingest_image(source, max_dimension=None, mode='RGB'):
+    """Decode a path, file object or encoded bytes at reduced resolution.
+
+    JPEGs are decoded through libjpeg's DCT scaling (``Image.draft``) at the
+    smallest 1/2, 1/4 or 1/8 scale that still covers ``max_dimension`` on
+    the longer side (0 keeps full resolution), then resized to fit exactly.
+    EXIF orientation is applied when ``Config.INGEST_EXIF_TRANSPOSE`` is set.
+
+    Returns ``(array, scale)``: a contiguous uint8 array in ``mode`` ('RGB'
+    or 'L') and its size relative to the full-resolution image.
+    """
+    with StageTimer('image_decode'):
+        return _ingest_image(source, Config.INGEST_MAX_DIMENSION if max_dimension is None else max_dimension, mode)
+
+
+def _ingest_image(source, max_dimension, mode):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if not len(source):
+            raise ValueError("Could not decode image data")
+        source = io.BytesIO(source)
+
+    try:
+        image = Image.open(source)
+        full_size = max(image.size)
+        if max_dimension and full_size > max_dimension:
+            ratio = max_dimension / float(full_size)
+            image.draft(mode, (math.ceil(image.size[0] * ratio), math.ceil(image.size[1] * ratio)))
+        if Config.INGEST_EXIF_TRANSPOSE:
+            image = ImageOps.exif_transpose(image)
+        if image.mode != mode:
+            image = image.convert(mode)
+        array = np.array(image)
+    except (OSError, SyntaxError) as e:
+        raise ValueError(f"Could not decode image data: {e}")
+
+    height, width = array.shape[:2]
+    if max_dimension and max(height, width) > max_dimension:
+        ratio = max_dimension / float(max(height, width))
+        # After DCT scaling less than 2x is left, where bilinear is alias-free and ~7x cheaper than area
+        interpolation = cv2.INTER_LINEAR if ratio > 0.5 else cv2.INTER_AREA
+        array = cv2.resize(array, (max(1, round(width * ratio)), max(1, round(height * ratio))), interpolation=interpolation)
+    return array, max(array.shape[:2]) / float(full_size)
+
+
+def ingest_rgb(source, max_dimension=None):
+    """Contiguous RGB uint8 array of an image decoded at reduced resolution"""
+    return ingest_image(source, max_dimension=max_dimension)[0]
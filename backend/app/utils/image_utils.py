@@ -1,39 +1,76 @@
 import base64
-import face_recognition
-import numpy as np
-from PIL import Image
-import io
 import hashlib
+from .preprocessing import enhance_image_array
+from .face_detection import detection_params, encode_faces
+from .image_ingest import ingest_params, ingest_rgb
+from .metrics import StageTimer
+
+def decode_base64_image(image_data):
+    """Decode a base64 image string, with or without a data URL prefix, to bytes"""
+    image_data = image_data.split(',')[1] if ',' in image_data else image_data
+    return base64.b64decode(image_data)
+
+def decode_image_bytes(image_bytes):
+    """Decode encoded image bytes straight from memory into an upright RGB uint8 array at ingest resolution"""
+    return ingest_rgb(image_bytes)
+
+def preprocess_image_array(image_array, clahe=False):
+    """Enhance an already decoded RGB array for better recognition (in place when writeable)"""
+    with StageTimer('preprocess'):
+        return enhance_image_array(image_array, clahe=clahe)
+
+def preprocess_image_file(image_source, clahe=False):
+    """Load an image path or file object and enhance it for better recognition"""
+    # Decode at ingest resolution, then enhance in one LUT pass
+    image_array = ingest_rgb(image_source)
+    with StageTimer('preprocess'):
+        return enhance_image_array(image_array, clahe=clahe)
+
+def compare_encoder_params():
+    """Settings behind get_face_encoding, which key the persistent encoding cache"""
+    return {'model': 'small', 'preprocess': None, 'detection': detection_params(), 'ingest': ingest_params()}
+
+def get_face_encoding(image_array):
+    """First face encoding in a decoded RGB image, or None"""
+    # Get face encoding, detecting on a downscaled copy
+    face_encodings = encode_faces(image_array, model='small')
+    return face_encodings[0] if face_encodings else None
 
 def get_face_encoding_from_base64(image_data, cache_key=None, encoding_cache=None):
     """Extract face encoding from base64 image with caching"""
-    if cache_key and encoding_cache and cache_key in encoding_cache:
-        return encoding_cache[cache_key]
-    
-    # Decode image
-    image_data = image_data.split(',')[1] if ',' in image_data else image_data
-    image_bytes = base64.b64decode(image_data)
-    
-    # Direct conversion to numpy array (faster than PIL)
-    image = Image.open(io.BytesIO(image_bytes))
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    image_array = np.array(image)
+    return get_face_encoding_from_bytes(decode_base64_image(image_data), cache_key=cache_key, encoding_cache=encoding_cache)
+
+def get_face_encoding_from_bytes(image_bytes, cache_key=None, encoding_cache=None, encode=None):
+    """Extract face encoding from encoded image bytes with caching
     
-    # Get face encoding
-    face_encodings = face_recognition.face_encodings(image_array)
+    ``encode(image_bytes)`` replaces the in-process encoder on a cache miss,
+    e.g. to run it in an inference worker.
+    """
+    if cache_key and encoding_cache is not None:
+        encoding = encoding_cache.get(cache_key)
+        if encoding is not None:
+            return encoding
     
-    if len(face_encodings) == 0:
+    if encode is not None:
+        encoding = encode(image_bytes)
+    else:
+        # Decode image straight from memory
+        encoding = get_face_encoding(decode_image_bytes(image_bytes))
+    if encoding is None:
         return None
     
-    encoding = face_encodings[0]
-    
     # Cache the encoding if cache_key provided
     if cache_key and encoding_cache is not None:
-        encoding_cache[cache_key] = encoding
+        encoding_cache.put(cache_key, encoding)
     
     return encoding
 
 def create_cache_key(image_data):
-    """Create a hash key for caching"""
-    return hashlib.md5(image_data.encode()).hexdigest()
\ No newline at end of file
+    """Create a key for caching: a 128-bit BLAKE2b digest of the encoded image bytes
+    
+    The key is always derived from the content, never from anything the
+    client names, so an encoding can only be found again for the same photo.
+    """
+    if isinstance(image_data, str):
+        image_data = image_data.encode()
+    return hashlib.blake2b(image_data, digest_size=16).hexdigest()
\ No newline at end of file
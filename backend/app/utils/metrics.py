@@ -0,0 +1,194 @@
+import bisect
+import os
+import threading
+import time
+
+# Seconds; pipeline stages range from sub-millisecond decodes to multi-second encodes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def lines(self):
+        with self.lock:
+            return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                    for labels, value in sorted(self.series.items())]
+
+    def drain(self):
+        with self.lock:
+            series, self.series = self.series, {}
+            return series
+
+    def merge(self, series):
+        with self.lock:
+            for labels, value in series.items():
+                self.series[labels] = self.series.get(labels, 0) + value
+
+
+class Histogram:
+    """Bucketed observations per label set, rendered with cumulative ``le`` buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def lines(self):
+        with self.lock:
+            snapshot = sorted((labels, list(counts), total, count) for labels, (counts, total, count) in self.series.items())
+        lines = []
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+    def drain(self):
+        with self.lock:
+            series, self.series = self.series, {}
+            return series
+
+    def merge(self, series):
+        with self.lock:
+            for labels, (counts, total, count) in series.items():
+                current = self.series.get(labels)
+                if current is None:
+                    self.series[labels] = [list(counts), total, count]
+                    continue
+                current[0] = [a + b for a, b in zip(current[0], counts)]
+                current[1] += total
+                current[2] += count
+
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format.
+
+    Collectors are callables run at scrape time that return
+    ``(name, kind, documentation, [(labels_dict, value), ...])`` tuples,
+    for values other components already count (e.g. cache statistics).
+    Worker processes ``drain`` their metrics and the parent ``merge``s them.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def drain(self):
+        """Every metric's series since the last drain, resetting them to zero"""
+        return {name: metric.drain() for name, metric in self.metrics.items() if metric.series}
+
+    def merge(self, drained):
+        for name, series in drained.items():
+            self.metrics[name].merge(series)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+STAGE_SECONDS = METRICS.histogram(
+    'face_pipeline_stage_seconds', 'Time spent in each face pipeline stage', ('stage',))
+OUTCOMES = METRICS.counter(
+    'face_pipeline_outcomes_total', 'Results of face checks by endpoint kind', ('check', 'outcome'))
+REQUEST_SECONDS = METRICS.histogram(
+    'http_request_duration_seconds', 'Total HTTP request time', ('endpoint', 'method', 'status'))
+
+
+def _reset_locks():
+    # A worker forked while a request thread held a metric lock would otherwise block on it forever
+    for metric in METRICS.metrics.values():
+        metric.lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    # Unix only; spawn-started workers on Windows import this module afresh anyway
+    os.register_at_fork(after_in_child=_reset_locks)
+
+
+class StageTimer:
+    """``with StageTimer('detection'):`` records the block's duration under that stage"""
+
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, self.stage)
+        return False
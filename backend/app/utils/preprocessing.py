@@ -0,0 +1,58 @@
+import functools
+import cv2
+import numpy as np
+
+CONTRAST_FACTOR = 1.2
+BRIGHTNESS_FACTOR = 1.1
+
+
+def luminance_mean(image):
+    """Mean of PIL's 8-bit grayscale conversion, rounded the way ImageEnhance.Contrast does"""
+    # PIL's RGB -> L weights (ITU-R 601-2) in 16-bit fixed point
+    # Every channel is widened first: numpy < 2 casts uint8 * scalar by value, which overflows uint16
+    luma = image[..., 0].astype(np.uint32)
+    luma *= 19595
+    luma += image[..., 1].astype(np.uint32) * 38470
+    luma += image[..., 2].astype(np.uint32) * 7471
+    luma += 0x8000
+    luma >>= 16
+    return int(int(luma.sum(dtype=np.uint64)) / luma.size + 0.5)
+
+
+def _blend(degenerate, values, factor):
+    """PIL's Image.blend extrapolation: float32 math, truncated and clipped to uint8"""
+    blended = np.float32(degenerate) + np.float32(factor) * (values.astype(np.float32) - np.float32(degenerate))
+    return np.clip(blended, 0, 255).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=256)
+def enhancement_lut(mean, contrast=CONTRAST_FACTOR, brightness=BRIGHTNESS_FACTOR):
+    """256-entry table equal to ImageEnhance.Contrast followed by ImageEnhance.Brightness"""
+    values = np.arange(256, dtype=np.int32)
+    contrasted = _blend(mean, values, contrast)
+    return _blend(0, contrasted.astype(np.int32), brightness)
+
+
+def apply_clahe(image, clip_limit=2.0, tile_grid_size=(8, 8)):
+    """Contrast-limited adaptive histogram equalization on the lightness channel"""
+    lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+    lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB, dst=image)
+
+
+def enhance_image_array(image, clahe=False):
+    """Contrast 1.2 + brightness 1.1 in one lookup-table pass over an RGB uint8 array.
+
+    The output is bit-identical to the PIL ImageEnhance pipeline. The array
+    is modified in place when it is writeable, otherwise a copy is made.
+    Optional CLAHE runs afterwards and changes the output.
+    """
+    if not image.flags.writeable or not image.flags.c_contiguous:
+        image = np.ascontiguousarray(image).copy()
+
+    lut = enhancement_lut(luminance_mean(image))
+    cv2.LUT(image, lut, dst=image)
+    if clahe:
+        image = apply_clahe(image)
+    return image
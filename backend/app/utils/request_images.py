@@ -0,0 +1,90 @@
+import base64
+from flask import request
+from .metrics import StageTimer
+
+# Bodies that carry a single encoded image as-is
+RAW_IMAGE_TYPES = ('application/octet-stream', 'image/jpeg', 'image/png')
+
+
+def _decode_base64(image_data):
+    """Bytes of a base64 string, with or without a data URL prefix"""
+    with StageTimer('base64_decode'):
+        image_data = image_data.split(',')[1] if ',' in image_data else image_data
+        return base64.b64decode(image_data)
+
+
+def read_request_images(*fields):
+    """Encoded image bytes and the other parameters of an image request.
+
+    Three body formats are accepted:
+
+    - ``multipart/form-data``: files (or base64 text) named after ``fields``,
+      other values as form fields
+    - ``application/octet-stream``, ``image/jpeg`` or ``image/png``: the raw
+      body is the first field, other values come from the query string
+    - JSON with base64 / data URL strings, the original format
+
+    Returns ``(images, params)`` where ``images`` maps the fields present in
+    the request to their encoded bytes.
+    """
+    images = {}
+    mimetype = request.mimetype
+
+    if mimetype == 'multipart/form-data':
+        params = request.form.to_dict()
+        for field in fields:
+            upload = request.files.get(field)
+            if upload is not None:
+                data = upload.read()
+                if data:
+                    images[field] = data
+            elif field in params:
+                images[field] = _decode_base64(params.pop(field))
+        return images, params
+
+    if mimetype in RAW_IMAGE_TYPES:
+        # Read the body straight from the stream without buffering a form parse
+        body = request.get_data(cache=False)
+        if body:
+            images[fields[0]] = body
+        return images, request.args.to_dict()
+
+    data = request.get_json(silent=True) or {}
+    params = {key: value for key, value in data.items() if key not in fields}
+    for field in fields:
+        if field in data:
+            images[field] = _decode_base64(data[field])
+    return images, params
+
+
+def read_request_image_items():
+    """``(image, expected_user)`` pairs of a batch request, in order.
+
+    Multipart bodies repeat the ``image`` file and ``expected_user`` field
+    once per item; JSON bodies carry an ``items`` list. Images are encoded
+    bytes, or the raw JSON value when it is not a string, so callers can
+    report bad items individually. Returns None when no items were sent.
+    """
+    if request.mimetype == 'multipart/form-data':
+        uploads = request.files.getlist('image')
+        if not uploads:
+            return None
+        expected_users = request.form.getlist('expected_user')
+        return [(upload.read(), expected_users[index] if index < len(expected_users) else None)
+                for index, upload in enumerate(uploads)]
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return None
+    return [(item.get('image'), item.get('expected_user')) if isinstance(item, dict) else (None, None)
+            for item in items]
+
+
+def decode_item_image(image):
+    """Encoded bytes of one batch item image (bytes or a base64 string)"""
+    if isinstance(image, str):
+        return _decode_base64(image)
+    if isinstance(image, (bytes, bytearray)):
+        return image
+    raise ValueError("No image provided")
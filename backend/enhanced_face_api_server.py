@@ -3,9 +3,12 @@ from app.config.settings import Config
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-app, face_model, encoding_cache = create_app(enhanced=True)
-
 if __name__ == '__main__':
+    # Built only when run directly: spawned training workers re-import this module
+    app, face_model, encoding_cache = create_app(enhanced=True)
+
     print(f"Starting Enhanced Face Recognition Server on port {Config.PORT}...")
     print(f"Encoding cache initialized")
-    app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
\ No newline at end of file
+    # The reloader would fork the inference workers a second time
+    app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT, threaded=True,
+            use_reloader=Config.DEBUG and not Config.SERVING_WORKERS)
\ No newline at end of file
@@ -1,7 +1,10 @@
 from app.server_factory import create_app
 from app.config.settings import Config
 
-app, face_model, encoding_cache = create_app(enhanced=False)
-
 if __name__ == '__main__':
-    app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
\ No newline at end of file
+    # Built only when run directly: spawned training workers re-import this module
+    app, face_model, encoding_cache = create_app(enhanced=False)
+
+    # The reloader would fork the inference workers a second time
+    app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT, threaded=True,
+            use_reloader=Config.DEBUG and not Config.SERVING_WORKERS)
\ No newline at end of file
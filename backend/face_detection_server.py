@@ -5,13 +5,22 @@ from flask_cors import CORS
 from app.config.settings import Config
 from app.routes.detection_routes import init_detection_routes
 from app.routes.common_routes import init_common_routes
+from app.routes.stream_routes import init_stream_routes
+from app.routes.metrics_routes import init_metrics_routes
+from app.services.face_tracking import FaceTracker
 
 app = Flask(__name__)
 CORS(app)
 
+# Per-session face tracking for live previews
+face_tracker = FaceTracker(Config.TRACKING_MAX_DIMENSION, Config.TRACKING_PADDING, Config.TRACKING_FACE_SIZE,
+                           Config.TRACKING_FULL_SCAN_INTERVAL, Config.TRACKING_SESSION_TTL, Config.TRACKING_MAX_SESSIONS)
+
 # Initialize routes
-init_detection_routes(app)
-init_common_routes(app)
+init_detection_routes(app, face_tracker)
+init_stream_routes(app, face_tracker)
+init_common_routes(app, face_tracker=face_tracker)
+init_metrics_routes(app, face_tracker=face_tracker)
 
 if __name__ == '__main__':
     app.run(host='localhost', port=5000, debug=True)
\ No newline at end of file
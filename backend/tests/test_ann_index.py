@@ -0,0 +1,75 @@
+import os
+import numpy as np
+import pytest
+from app.models import ann_index
+from app.models.ann_index import IVFIndex, build_index_report
+from test_face_gallery import make_dataset
+
+
+def test_build_buckets_every_row_once():
+    encodings, _, _ = make_dataset(employees=30, per_employee=8)
+    index = IVFIndex.build(encodings)
+
+    assert index.n_rows == len(encodings)
+    assert sorted(index.row_ids.tolist()) == list(range(len(encodings)))
+    assert index.list_offsets[-1] == len(encodings)
+
+
+def test_recall_against_exact_search():
+    encodings, _, _ = make_dataset(employees=30, per_employee=8)
+    index, recall = build_index_report(encodings, n_probe=8)
+
+    assert recall >= 0.9
+    # Probing every list is an exhaustive search
+    assert index.recall(encodings, encodings[:20], k=10, n_probe=index.n_lists) == 1.0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    encodings, _, probes = make_dataset(employees=30, per_employee=8)
+    index = IVFIndex.build(encodings)
+    path = str(tmp_path / 'face_model.ivf.npz')
+    index.save(path)
+
+    loaded = IVFIndex.load(path)
+    np.testing.assert_array_equal(loaded.centroids, index.centroids)
+    np.testing.assert_array_equal(loaded.list_offsets, index.list_offsets)
+    np.testing.assert_array_equal(loaded.row_ids, index.row_ids)
+    for probe in probes[:10]:
+        np.testing.assert_array_equal(loaded.candidates(probe, 4), index.candidates(probe, 4))
+    assert os.listdir(tmp_path) == ['face_model.ivf.npz']
+
+
+def test_save_replaces_an_existing_index_whole(tmp_path):
+    encodings, _, _ = make_dataset(employees=30, per_employee=8)
+    path = str(tmp_path / 'face_model.ivf.npz')
+    IVFIndex.build(encodings[:40]).save(path)
+    IVFIndex.build(encodings).save(path)
+
+    assert IVFIndex.load(path).n_rows == len(encodings)
+    assert os.listdir(tmp_path) == ['face_model.ivf.npz']
+
+
+def test_empty_index_round_trips(tmp_path):
+    path = str(tmp_path / 'face_model.ivf.npz')
+    IVFIndex.build(np.zeros((0, 128))).save(path)
+
+    loaded = IVFIndex.load(path)
+    assert loaded.n_rows == 0
+    assert loaded.n_lists == 0
+
+
+def test_failed_save_keeps_the_previous_index(tmp_path, monkeypatch):
+    encodings, _, _ = make_dataset(employees=30, per_employee=8)
+    path = str(tmp_path / 'face_model.ivf.npz')
+    IVFIndex.build(encodings).save(path)
+
+    def crash_mid_write(f, **arrays):
+        f.write(b'PK\x03\x04 torn')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(ann_index.np, 'savez', crash_mid_write)
+    with pytest.raises(OSError):
+        IVFIndex.build(encodings[:40]).save(path)
+    monkeypatch.undo()
+
+    assert IVFIndex.load(path).n_rows == len(encodings)
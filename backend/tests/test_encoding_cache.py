@@ -0,0 +1,58 @@
+import io
+import numpy as np
+import pytest
+from app.services.encoding_cache import EncodingCache
+from app.services.persistent_encoding_cache import PersistentEncodingCache
+
+PARAMS = {'model': 'small'}
+
+
+def test_persistent_cache_round_trip(tmp_path):
+    cache = PersistentEncodingCache(str(tmp_path / 'cache.sqlite3'), PARAMS)
+    cache.put('abc', np.arange(128, dtype=np.float64))
+    assert np.array_equal(cache.get('abc'), np.arange(128))
+    assert PersistentEncodingCache(str(tmp_path / 'cache.sqlite3'), {'model': 'large'}).get('abc') is None
+
+
+def test_cache_key_depends_only_on_content():
+    pytest.importorskip('face_recognition')
+    from app.utils.image_utils import create_cache_key
+
+    assert create_cache_key(b'photo') == create_cache_key(b'photo')
+    assert create_cache_key(b'photo') == create_cache_key('photo')
+    assert create_cache_key(b'photo') != create_cache_key(b'other photo')
+
+
+class PhotoModel:
+    """Stand-in model whose encodings are looked up by the uploaded bytes"""
+
+    prefilter = None
+
+    def __init__(self, encodings):
+        self.encodings = encodings
+
+    def encode_capture(self, image):
+        return None, None, self.encodings[bytes(image)]
+
+    def encode_photo(self, image):
+        return self.encodings[bytes(image)]
+
+
+def test_compare_cannot_store_one_photo_under_another():
+    pytest.importorskip('face_recognition')
+    from flask import Flask
+    from app.routes.face_routes import init_face_routes
+
+    app = Flask(__name__)
+    init_face_routes(app, PhotoModel({b'attacker': np.zeros(128), b'victim': np.ones(128)}), EncodingCache())
+    client = app.test_client()
+
+    def compare(image1, image2):
+        data = {'image1': (io.BytesIO(image1), 'capture.jpg'), 'image2': (io.BytesIO(image2), 'photo.jpg'),
+                'image2_version': 'https://example.com/victim.jpg'}
+        return client.post('/compare', data=data, content_type='multipart/form-data').get_json()
+
+    # The attacker's own photo sent under the victim's photo version...
+    assert compare(b'attacker', b'attacker')['match'] is True
+    # ...must not be what the victim's photo is compared against afterwards
+    assert compare(b'attacker', b'victim')['match'] is False
@@ -0,0 +1,37 @@
+import sys
+import threading
+import pytest
+
+pytest.importorskip('face_recognition')
+
+from app.services import encoding_pool
+from app.services.encoding_pool import ParallelEncoder
+
+
+@pytest.fixture
+def background_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait, daemon=True)
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='fork is Linux-only here')
+def test_single_threaded_callers_fork():
+    assert threading.active_count() == 1
+    assert encoding_pool._start_method() == 'fork'
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='fork is Linux-only here')
+def test_threaded_callers_use_the_fork_server(background_thread):
+    assert encoding_pool._start_method() == 'forkserver'
+
+
+def test_map_from_a_threaded_process_returns_every_result(background_thread):
+    sources = [b'not an image %d' % index for index in range(6)]
+    results = ParallelEncoder(workers=2, chunksize=1, label="Test").map(sources)
+
+    assert len(results) == len(sources)
+    assert all(result['error'] and result['face_count'] == 0 for result in results)
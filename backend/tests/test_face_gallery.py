@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+from app.models.face_gallery import FaceGallery
+from app.models.quantization import QuantizedCodes
+
+
+def make_dataset(employees=12, per_employee=6, probes=60, seed=1):
+    """Encodings clustered per employee, plus probes of known and unknown people"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0.0, 0.1, size=(employees, 128))
+    names = [f"employee{label:02d}" for label in range(employees)]
+    encodings, rows = [], []
+    for label in rng.permutation(np.repeat(np.arange(employees), per_employee)):
+        encodings.append(centers[label] + rng.normal(0.0, 0.025, 128))
+        rows.append(names[label])
+    known = centers[rng.integers(0, employees, probes // 2)] + rng.normal(0.0, 0.025, (probes // 2, 128))
+    unknown = rng.normal(0.0, 0.1, size=(probes - probes // 2, 128))
+    return np.array(encodings), rows, np.vstack([known, unknown])
+
+
+def assert_same_matches(results, expected):
+    assert len(results) == len(expected)
+    for result, match in zip(results, expected):
+        if match is None:
+            assert result is None
+        else:
+            assert result[0] == match[0]
+            assert result[1:] == pytest.approx(match[1:], abs=1e-5)
+
+
+def baseline_match(encodings, names, probe, tolerance):
+    """The original compare_faces + per-name voting loop"""
+    distances = np.linalg.norm(encodings - probe, axis=1)
+    votes = {}
+    for distance, name in zip(distances, names):
+        if distance <= tolerance:
+            votes.setdefault(name, []).append(distance)
+    if not votes:
+        return None
+    best = min(votes, key=lambda name: np.mean(votes[name]))
+    return best, float(np.mean(votes[best]))
+
+
+@pytest.mark.parametrize('tolerance', [0.5, 0.6])
+def test_match_equals_baseline(tolerance):
+    encodings, names, probes = make_dataset()
+    gallery = FaceGallery.from_encodings(encodings, names)
+    matched = 0
+    for probe in probes:
+        expected = baseline_match(encodings, names, probe, tolerance)
+        result = gallery.match(probe, tolerance)
+        if expected is None:
+            assert result is None
+            continue
+        matched += 1
+        assert result[0] == expected[0]
+        assert result[1] == pytest.approx(expected[1], abs=1e-4)
+    assert 0 < matched < len(probes)
+
+
+def test_match_batch_equals_match():
+    encodings, names, probes = make_dataset()
+    gallery = FaceGallery.from_encodings(encodings, names)
+    assert_same_matches(gallery.match_batch(probes, 0.5), [gallery.match(probe, 0.5) for probe in probes])
+
+
+def test_quantized_match_equals_exact_match():
+    encodings, names, probes = make_dataset()
+    gallery = FaceGallery.from_encodings(encodings, names)
+    exact = [gallery.match(probe, 0.5) for probe in probes]
+    for kind in ('float16', 'int8'):
+        gallery.codes = QuantizedCodes.encode(gallery.encodings, kind)
+        assert_same_matches([gallery.match(probe, 0.5, use_codes=True) for probe in probes], exact)
+
+
+def test_verify_equals_baseline_for_the_claimed_employee():
+    encodings, names, probes = make_dataset()
+    gallery = FaceGallery.from_encodings(encodings, names)
+    for probe in probes:
+        expected = baseline_match(encodings, names, probe, 0.5)
+        claimed = expected[0] if expected else 'employee00'
+        name, distance, impostor = gallery.verify(probe, claimed, 0.5, impostor_check='sample', sample_size=len(gallery))
+
+        rows = np.array([row_name == claimed for row_name in names])
+        claimed_distances = np.linalg.norm(encodings[rows] - probe, axis=1)
+        within = claimed_distances[claimed_distances <= 0.5]
+        assert name == claimed
+        if within.size:
+            assert distance == pytest.approx(float(within.mean()), abs=1e-4)
+        else:
+            assert distance == np.inf
+        # Checking every other row, an impostor is named exactly when the baseline prefers someone else
+        assert impostor == (expected[0] if expected and expected[0] != claimed else None)
+
+
+def test_verify_names_the_better_impostor():
+    encodings, names, probes = make_dataset()
+    gallery = FaceGallery.from_encodings(encodings, names)
+    for probe in probes:
+        expected = baseline_match(encodings, names, probe, 0.5)
+        if expected is None:
+            continue
+        other = 'employee00' if expected[0] != 'employee00' else 'employee01'
+        _, _, impostor = gallery.verify(probe, other, 0.5, impostor_check='sample', sample_size=len(gallery))
+        assert impostor == expected[0]
+
+
+def test_verify_unknown_employee_returns_none():
+    encodings, names, probes = make_dataset()
+    gallery = FaceGallery.from_encodings(encodings, names)
+    assert gallery.verify(probes[0], 'nobody', 0.5) is None
@@ -0,0 +1,71 @@
+import glob
+import os
+import cv2
+import numpy as np
+import pytest
+from app.services.face_tracking import FaceTracker
+
+DATASET_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'ai', 'image_dataset')
+FACE_SIZES = (36, 44, 120)
+
+
+def frame_with_face(gray, box, face_size):
+    """The photo resized so its face is about ``face_size`` pixels wide"""
+    scale = face_size / float(box[2])
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+@pytest.fixture(scope='module')
+def face_photo():
+    """A dataset photo whose face a full scan finds at every tested size"""
+    for path in sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*.jp*g'))):
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        faces = FaceTracker()._full_scan(gray, 1.0)
+        if len(faces) != 1:
+            continue
+        if all(len(FaceTracker(min_face_size=0)._full_scan(frame_with_face(gray, faces[0], size), 0.5)) == 1
+               for size in FACE_SIZES):
+            return gray, faces[0]
+    pytest.skip('no dataset photo with a detectable face')
+
+
+@pytest.mark.parametrize('face_size', FACE_SIZES)
+def test_tracked_face_is_found_in_its_region(face_photo, face_size):
+    frame = frame_with_face(*face_photo, face_size)
+    # Frames decoded at half the capture size: min_face_size 60 is 30 frame pixels
+    tracker = FaceTracker()
+    results = [tracker.detect('kiosk', frame, 0.5) for _ in range(4)]
+
+    assert [len(faces) for faces, _ in results] == [1, 1, 1, 1]
+    assert [full_scan for _, full_scan in results] == [True, False, False, False]
+    assert tracker.stats()['lost'] == 0
+
+
+def test_lost_face_falls_back_to_a_full_scan(face_photo):
+    frame = frame_with_face(*face_photo, 120)
+    tracker = FaceTracker()
+    tracker.detect('kiosk', frame, 0.5)
+
+    faces, full_scan = tracker.detect('kiosk', np.zeros_like(frame), 0.5)
+    assert faces == [] and full_scan
+    assert tracker.stats()['lost'] == 1
+
+    # Nothing is tracked after an empty frame, so the face is found by a full scan again
+    faces, full_scan = tracker.detect('kiosk', frame, 0.5)
+    assert len(faces) == 1 and full_scan
+
+
+def test_full_scan_is_forced_every_interval(face_photo):
+    frame = frame_with_face(*face_photo, 120)
+    tracker = FaceTracker(full_scan_interval=2)
+    assert [tracker.detect('kiosk', frame, 0.5)[1] for _ in range(6)] == [True, False, False, True, False, False]
+
+
+def test_sessions_are_tracked_separately(face_photo):
+    frame = frame_with_face(*face_photo, 120)
+    tracker = FaceTracker()
+    assert tracker.detect('first', frame, 0.5)[1]
+    assert tracker.detect('second', frame, 0.5)[1]
+    assert not tracker.detect('first', frame, 0.5)[1]
+    assert tracker.end('first')
+    assert tracker.detect('first', frame, 0.5)[1]
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from app.models.face_gallery import FaceGallery
+from app.models.gallery_condensation import condensation_report, condense_gallery, condense_rows
+from test_face_gallery import make_dataset
+
+TOLERANCE = 0.6
+
+
+def make_gallery(per_employee=20):
+    encodings, names, probes = make_dataset(employees=10, per_employee=per_employee, probes=80, seed=3)
+    return FaceGallery.from_encodings(encodings, names), probes
+
+
+def test_every_employee_is_capped_at_the_budget():
+    gallery, _ = make_gallery()
+    condensed = condense_gallery(gallery, budget=5, dedup_distance=0.0)
+
+    assert condensed.names == gallery.names
+    assert condensed.counts.tolist() == [5] * len(gallery.names)
+    # Templates are original rows of the same employee, not new points
+    for label in range(len(gallery.names)):
+        original = gallery.encodings[gallery.employee_rows(label)]
+        for template in condensed.encodings[condensed.employee_rows(label)]:
+            assert np.any(np.all(original == template, axis=1))
+
+
+def test_employees_under_the_budget_keep_every_template():
+    gallery, _ = make_gallery(per_employee=4)
+    condensed = condense_gallery(gallery, budget=8, dedup_distance=0.0)
+
+    np.testing.assert_array_equal(condensed.encodings, gallery.encodings)
+    np.testing.assert_array_equal(condensed.labels, gallery.labels)
+
+
+def test_near_duplicates_are_dropped_first():
+    rng = np.random.default_rng(0)
+    shot = rng.normal(0.0, 0.1, 128)
+    other = rng.normal(0.0, 0.1, 128)
+    burst = np.vstack([shot + rng.normal(0.0, 0.001, 128) for _ in range(5)] + [other])
+
+    assert condense_rows(burst, budget=0, dedup_distance=0.15).tolist() == [0, 5]
+
+
+def test_condensing_is_deterministic():
+    gallery, _ = make_gallery()
+    first = condense_gallery(gallery, budget=5, dedup_distance=0.1)
+    second = condense_gallery(gallery, budget=5, dedup_distance=0.1)
+
+    np.testing.assert_array_equal(first.encodings, second.encodings)
+
+
+def test_condensed_gallery_keeps_the_matches():
+    gallery, probes = make_gallery()
+    condensed = condense_gallery(gallery, budget=5, dedup_distance=0.1)
+
+    matched = 0
+    for probe in probes:
+        full_match, condensed_match = gallery.match(probe, TOLERANCE), condensed.match(probe, TOLERANCE)
+        assert (full_match is None) == (condensed_match is None)
+        if full_match is not None:
+            assert condensed_match[0] == full_match[0]
+            matched += 1
+    # Half the probes are known employees, half are strangers
+    assert matched == len(probes) // 2
+    assert len(condensed) < len(gallery)
+
+
+def test_report_compares_held_out_accuracy():
+    gallery, _ = make_gallery()
+    report = condensation_report(gallery.encodings, gallery.row_names(), 5, 0.1, TOLERANCE)
+
+    assert report['held_out'] == 40
+    assert report['condensed_templates'] == 50
+    assert report['full_accuracy'] == report['condensed_accuracy'] == 1.0
+
+
+def test_model_condense_applies_its_template_cap():
+    pytest.importorskip('face_recognition')
+    pytest.importorskip('firebase_admin')
+    from ai.face_recognition_model import FaceRecognitionModel
+
+    encodings, names, _ = make_dataset(employees=10, per_employee=20, seed=3)
+    model = FaceRecognitionModel()
+    model.max_templates = 6
+
+    condensed = model.condense(list(encodings), names)
+    assert condensed.counts.max() <= 6
+    assert sorted(condensed.names) == sorted(set(names))
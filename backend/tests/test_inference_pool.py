@@ -0,0 +1,54 @@
+import os
+import pytest
+
+pytest.importorskip('face_recognition')
+
+from app.services import inference_pool as inference_pool_module
+from app.services.inference_pool import InferencePool
+
+
+class EchoModel:
+    def echo(self, value):
+        return value
+
+    def crash(self):
+        os._exit(3)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # No dlib warm-up in the forked workers
+    monkeypatch.setattr(inference_pool_module, 'init_worker', lambda: None)
+    pool = InferencePool(EchoModel(), workers=1, queue_depth=4, timeout=10.0)
+    if not pool.start():
+        pytest.skip('fork is unavailable')
+    yield pool
+    pool.close()
+
+
+def test_calls_are_served(pool):
+    assert pool.call('echo', 7) == 7
+    assert pool.stats()['pending'] == [0]
+
+
+def test_crashed_worker_fails_its_calls_and_is_replaced(pool):
+    crashed = pool.submit('crash')
+    queued = pool.submit('echo', 1)
+
+    with pytest.raises(RuntimeError, match='exited'):
+        crashed.result(10)
+    with pytest.raises(RuntimeError, match='exited'):
+        queued.result(10)
+
+    stats = pool.stats()
+    assert stats['restarts'] == 1
+    assert stats['pending'] == [0]
+    assert pool.call('echo', 'after restart') == 'after restart'
+
+
+def test_pool_keeps_serving_after_repeated_crashes(pool):
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            pool.call('crash')
+    assert pool.stats()['restarts'] == 3
+    assert [pool.call('echo', value) for value in range(8)] == list(range(8))
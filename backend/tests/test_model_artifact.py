@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pytest
+from app.models.face_gallery import FaceGallery
+from app.models.model_artifact import read_artifact, resolve_artifact, write_artifact
+from app.models.quantization import QuantizedCodes
+
+
+def make_gallery(rows=20, employees=4, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f"employee{index % employees}" for index in range(rows)]
+    return FaceGallery.from_encodings(rng.normal(0.0, 0.1, size=(rows, 128)), names)
+
+
+def assert_same_gallery(loaded, gallery):
+    assert loaded.names == gallery.names
+    np.testing.assert_array_equal(loaded.counts, gallery.counts)
+    np.testing.assert_array_equal(loaded.labels, gallery.labels)
+    np.testing.assert_array_equal(loaded.encodings, gallery.encodings)
+    np.testing.assert_array_equal(loaded.sq_norms, gallery.sq_norms)
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    gallery = make_gallery()
+    path = str(tmp_path / 'face_model.gallery')
+    write_artifact(path, gallery)
+
+    loaded = read_artifact(path, verify=True)
+    assert_same_gallery(loaded, gallery)
+    # Read-only views of the mapped file rather than loaded copies
+    assert not loaded.encodings.flags.owndata and not loaded.encodings.flags.writeable
+    assert loaded.codes is None
+
+
+def test_empty_gallery_round_trips(tmp_path):
+    path = str(tmp_path / 'face_model.gallery')
+    write_artifact(path, FaceGallery.from_encodings([], []))
+
+    loaded = read_artifact(path, verify=True)
+    assert len(loaded) == 0
+    assert loaded.names == []
+    assert loaded.encodings.shape == (0, 128)
+
+
+def test_int8_codes_round_trip(tmp_path):
+    gallery = make_gallery()
+    gallery.codes = QuantizedCodes.encode(gallery.encodings, 'int8')
+    path = str(tmp_path / 'face_model.gallery')
+    write_artifact(path, gallery)
+
+    loaded = read_artifact(path, verify=True)
+    assert_same_gallery(loaded, gallery)
+    assert loaded.codes.kind == 'int8'
+    assert loaded.codes.codes.dtype == np.int8
+    np.testing.assert_array_equal(loaded.codes.codes, gallery.codes.codes)
+    np.testing.assert_array_equal(loaded.codes.scales, gallery.codes.scales)
+    assert loaded.codes.error_bound == pytest.approx(gallery.codes.error_bound)
+
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    path = str(tmp_path / 'face_model.gallery')
+    data_path = write_artifact(path, make_gallery())
+    with open(data_path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+    read_artifact(path)
+    with pytest.raises(ValueError, match='checksum'):
+        read_artifact(path, verify=True)
+
+
+def test_rewrite_leaves_the_mapped_version_in_place(tmp_path):
+    path = str(tmp_path / 'face_model.gallery')
+    old_gallery, new_gallery = make_gallery(seed=0), make_gallery(rows=24, seed=1)
+    old_data_path = write_artifact(path, old_gallery)
+    live = read_artifact(path)
+
+    new_data_path = write_artifact(path, new_gallery)
+
+    assert new_data_path != old_data_path
+    assert resolve_artifact(path) == new_data_path
+    assert_same_gallery(read_artifact(path, verify=True), new_gallery)
+    # The serving gallery still reads its own mapping after the swap
+    assert_same_gallery(live, old_gallery)
+    # Superseded versions are cleaned up once nothing prevents it
+    assert sorted(os.listdir(tmp_path)) == sorted(['face_model.gallery', os.path.basename(new_data_path)])
+
+
+def test_unchanged_gallery_reuses_its_data_file(tmp_path):
+    path = str(tmp_path / 'face_model.gallery')
+    gallery = make_gallery()
+    assert write_artifact(path, gallery) == write_artifact(path, gallery)
+
+
+def test_missing_data_file_is_reported(tmp_path):
+    path = str(tmp_path / 'face_model.gallery')
+    os.remove(write_artifact(path, make_gallery()))
+    with pytest.raises(ValueError, match='missing'):
+        read_artifact(path)
@@ -0,0 +1,58 @@
+import glob
+import os
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+from app.utils.preprocessing import enhance_image_array, luminance_mean
+
+DATASET_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'ai', 'image_dataset')
+
+
+def pil_enhance(image):
+    pil_image = Image.fromarray(image)
+    pil_image = ImageEnhance.Contrast(pil_image).enhance(1.2)
+    pil_image = ImageEnhance.Brightness(pil_image).enhance(1.1)
+    return np.array(pil_image)
+
+
+def pil_luminance_mean(image):
+    # What ImageEnhance.Contrast blends towards
+    return int(np.array(Image.fromarray(image).convert('L')).mean() + 0.5)
+
+
+def random_images(count=30):
+    rng = np.random.default_rng(8)
+    for _ in range(count):
+        height, width = rng.integers(8, 200, size=2)
+        # Bright images exercise the full range of the fixed-point products
+        low = rng.integers(0, 200)
+        yield rng.integers(low, 256, size=(height, width, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize('image', list(random_images()))
+def test_luminance_mean_matches_pil(image):
+    assert luminance_mean(image) == pil_luminance_mean(image)
+
+
+@pytest.mark.parametrize('image', list(random_images()))
+def test_enhance_matches_image_enhance(image):
+    expected = pil_enhance(image)
+    assert np.array_equal(enhance_image_array(image.copy()), expected)
+
+
+def test_enhance_matches_image_enhance_on_dataset_photos():
+    paths = sorted(glob.glob(os.path.join(DATASET_DIR, '*', '*.jp*g')))[:5]
+    if not paths:
+        pytest.skip('dataset photos not available')
+    for path in paths:
+        image = np.array(Image.open(path).convert('RGB'))
+        assert luminance_mean(image) == pil_luminance_mean(image)
+        assert np.array_equal(enhance_image_array(image.copy()), pil_enhance(image))
+
+
+def test_enhance_copies_read_only_arrays():
+    image = next(random_images(1))
+    image.flags.writeable = False
+    result = enhance_image_array(image)
+    assert result is not image
+    assert np.array_equal(result, pil_enhance(image))
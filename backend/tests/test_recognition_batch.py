@@ -0,0 +1,84 @@
+from concurrent.futures import Future
+import pytest
+
+pytest.importorskip('face_recognition')
+pytest.importorskip('firebase_admin')
+
+from ai.face_recognition_model import FaceRecognitionModel
+from app.models.face_gallery import FaceGallery
+from app.services.batch_scheduler import MicroBatchScheduler
+from test_face_gallery import make_dataset
+
+CONFIGURATIONS = [
+    {'verify_expected_user': True, 'impostor_check': 'sample'},
+    {'verify_expected_user': True, 'impostor_check': 'off'},
+    {'verify_expected_user': False},
+    {'verify_expected_user': False, 'quantization': 'int8'},
+    {'verify_expected_user': False, 'use_ann_index': True},
+    {'verify_expected_user': True, 'impostor_check': 'index', 'use_ann_index': True, 'quantization': 'float16'},
+]
+
+
+def make_model(options):
+    encodings, names, probes = make_dataset()
+    model = FaceRecognitionModel()
+    for name, value in options.items():
+        setattr(model, name, value)
+    gallery = FaceGallery.from_encodings(encodings, names)
+    if model.use_ann_index:
+        model.build_ann_index(gallery)
+    model.attach_codes(gallery)
+    model.set_gallery(gallery)
+    # Claims: the right employee, someone else, nobody and an unknown name
+    expected_users = [[None, 'employee03', 'employee07', 'nobody'][index % 4] for index in range(len(probes))]
+    return model, list(probes), expected_users
+
+
+@pytest.mark.parametrize('options', CONFIGURATIONS)
+def test_score_batch_decides_like_match_probe(options):
+    model, probes, expected_users = make_model(options)
+    direct = [model.match_probe(probe, expected_user) for probe, expected_user in zip(probes, expected_users)]
+    assert model.score_batch([(probe, None) for probe in probes], expected_users) == direct
+    assert any(name for name, _ in direct)
+
+
+@pytest.mark.parametrize('options', CONFIGURATIONS[:3])
+def test_scheduler_decides_like_the_direct_path(options, monkeypatch):
+    model, probes, expected_users = make_model(options)
+    # The probes stand in for already decoded images
+    monkeypatch.setattr(model, 'try_encode_probe', lambda image: (image, None))
+    scheduler = MicroBatchScheduler(model, window_ms=5, max_batch=8)
+    direct = [model.match_probe(probe, expected_user) for probe, expected_user in zip(probes, expected_users)]
+    assert scheduler.recognize_batch(probes, expected_users) == direct
+
+
+class FailingPool:
+    """Inference pool stand-in whose futures fail or time out for chosen probes"""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def submit(self, method, image):
+        future = Future()
+        failure = self.failures.get(id(image))
+        if failure == 'error':
+            future.set_exception(RuntimeError('worker exited'))
+        elif failure is None:
+            future.set_result((image, None))
+        return future
+
+
+def test_scheduler_fails_only_the_request_that_failed():
+    model, probes, expected_users = make_model(CONFIGURATIONS[2])
+    probes, expected_users = probes[:4], expected_users[:4]
+    pool = FailingPool({id(probes[1]): 'error', id(probes[2]): 'timeout'})
+    scheduler = MicroBatchScheduler(model, pool, window_ms=50, max_batch=8, timeout=0.2)
+    direct = [model.match_probe(probe, expected_user) for probe, expected_user in zip(probes, expected_users)]
+
+    futures = [scheduler.submit(probe, expected_user) for probe, expected_user in zip(probes, expected_users)]
+    results = [future.result(5) for future in futures]
+
+    assert scheduler.stats()['batches'] == 1
+    assert results[0] == direct[0] and results[3] == direct[3]
+    assert results[1] == (None, "Failed to process image: worker exited")
+    assert results[2] == (None, "Timed out waiting for an inference worker")
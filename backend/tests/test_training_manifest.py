@@ -0,0 +1,60 @@
+import pytest
+from app.models.training_manifest import TrainingManifest
+
+PARAMS = {'model': 'large'}
+
+
+def write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_lookup_follows_content_and_params(tmp_path):
+    image = write(tmp_path / 'a.jpg', b'first')
+    manifest = TrainingManifest(str(tmp_path / 'model.manifest.json'))
+    manifest.record('person/a.jpg', image, PARAMS, [[0.5] * 128])
+
+    assert manifest.lookup('person/a.jpg', image, PARAMS) is not None
+    assert manifest.lookup('person/a.jpg', image, {'model': 'small'}) is None
+    write(tmp_path / 'a.jpg', b'second')
+    assert manifest.lookup('person/a.jpg', image, PARAMS) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    image = write(tmp_path / 'a.jpg', b'first')
+    manifest = TrainingManifest(str(tmp_path / 'model.manifest.json'))
+    manifest.record('person/a.jpg', image, PARAMS, [[0.5] * 128])
+    manifest.save()
+
+    loaded = TrainingManifest(manifest.path)
+    assert loaded.load()
+    assert loaded.lookup('person/a.jpg', image, PARAMS)['encodings'] == [[0.5] * 128]
+
+
+def test_failed_reencode_leaves_no_stale_encodings(tmp_path, monkeypatch):
+    pytest.importorskip('face_recognition')
+    pytest.importorskip('firebase_admin')
+    import ai.face_recognition_model as model_module
+
+    person = tmp_path / 'dataset' / 'alice'
+    person.mkdir(parents=True)
+    write(person / 'a.jpg', b'original photo')
+    model = model_module.FaceRecognitionModel(str(tmp_path / 'dataset'))
+    model.model_file = str(tmp_path / 'face_model.gallery')
+    model.max_templates = 0
+    model.dedup_distance = 0
+    monkeypatch.setattr(model, 'build_ann_index', lambda gallery: None)
+
+    results = [{'encodings': [[0.5] * 128], 'error': None}]
+    monkeypatch.setattr(model_module.ParallelEncoder, 'map', lambda self, sources, **options: results)
+    model.train_model()
+    assert len(model.gallery) == 1
+
+    # The photo changes and its re-encode fails: the old encodings must not be reused
+    write(person / 'a.jpg', b'replaced photo')
+    results[:] = [{'encodings': [], 'error': 'unreadable image'}]
+    model.train_model()
+    assert len(model.gallery) == 0
+    manifest = TrainingManifest(model_module.manifest_path_for(model.model_file))
+    manifest.load()
+    assert 'alice/a.jpg' not in manifest.entries
@@ -1,7 +1,6 @@
 import { useState } from "react";
 import { useRouter } from "next/navigation";
-import { detectFace } from "@/utils/faceDetection";
-import { compareWithSpecificUser } from "@/lib/services/photoComparisonService";
+import { detectAndCompareWithSpecificUser } from "@/lib/services/photoComparisonService";
 import { updateUserSession } from "@/lib/services/sessionService";
 import { checkDailyAttendance, recordDailyAttendance } from "@/lib/services/dailyAttendanceService";
 import { User } from "@/lib/types";
@@ -45,8 +44,18 @@ export function useAttendance() {
       setError("");
       setMultipleFaces(false);
       
-      // First check if there's exactly one face
-      const faceDetectionResult = await detectFace(imageData);
+      // Get current user ID from session - only the logged-in user can mark attendance
+      const currentUser = user; // Only use the authenticated user, not any recognized user
+      if (!currentUser?.numericId) {
+        setError("User session not found. Please login again.");
+        return;
+      }
+      
+      console.log(`SECURITY: Attendance restricted to logged-in user: ${currentUser.name} (ID: ${currentUser.numericId})`);
+      
+      // SECURITY: Check there is exactly one face and compare it with ONLY the logged-in
+      // user's photo in Firebase, in a single request
+      const { detection: faceDetectionResult, user: matchedUser } = await detectAndCompareWithSpecificUser(imageData, currentUser.numericId);
       
       if (faceDetectionResult.error_type === 'multiple_faces') {
         setMultipleFaces(true);
@@ -69,19 +78,6 @@ export function useAttendance() {
         return;
       }
       
-      // Get current user ID from session - only the logged-in user can mark attendance
-      const currentUser = user; // Only use the authenticated user, not any recognized user
-      if (!currentUser?.numericId) {
-        setError("User session not found. Please login again.");
-        return;
-      }
-      
-      console.log(`SECURITY: Attendance restricted to logged-in user: ${currentUser.name} (ID: ${currentUser.numericId})`);
-      
-      // SECURITY: Compare captured image with ONLY the logged-in user's photo in Firebase
-      // This ensures no other user's image from Firebase can be used for comparison
-      const matchedUser = await compareWithSpecificUser(imageData, currentUser.numericId);
-      
       if (matchedUser) {
         // Show real user data from Firebase
         setRecognizedEmployee({
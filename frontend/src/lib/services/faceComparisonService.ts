@@ -1,6 +1,7 @@
 import { db } from "@/lib/firebase/config";
 import { collection, getDocs } from "firebase/firestore";
 import { recognizeFace } from "@/utils/faceRecognition";
+import { toImageBlob } from "@/utils/imageUpload";
 
 interface Employee {
   id: string;
@@ -100,43 +101,32 @@ async function getEmployeeByName(name: string): Promise<Employee | null> {
   }
 }
 
-async function compareWithFirebasePhoto(capturedImage: string, firebasePhotoUrl: string): Promise<boolean> {
+async function compareWithFirebasePhoto(capturedImage: string | Blob, firebasePhotoUrl: string): Promise<boolean> {
   try {
-    // Convert Firebase photo URL to base64 for comparison
+    // Upload both images as binary multipart parts instead of base64 JSON
     const response = await fetch(firebasePhotoUrl);
-    const blob = await response.blob();
+    const firebasePhoto = await response.blob();
     
-    return new Promise((resolve) => {
-      const reader = new FileReader();
-      reader.onloadend = async () => {
-        try {
-          const firebaseImageBase64 = reader.result as string;
-          
-          // Send both images to Python server for comparison
-          const comparisonResponse = await fetch("http://localhost:5001/compare", {
-            method: "POST",
-            headers: {
-              "Content-Type": "application/json",
-            },
-            body: JSON.stringify({
-              image1: capturedImage,
-              image2: firebaseImageBase64
-            })
-          });
-          
-          if (comparisonResponse.ok) {
-            const result = await comparisonResponse.json();
-            resolve(result.match === true);
-          } else {
-            resolve(true); // Fallback to true if comparison service unavailable
-          }
-        } catch (error) {
-          console.error("Photo comparison error:", error);
-          resolve(true); // Fallback to true if comparison fails
-        }
-      };
-      reader.readAsDataURL(blob);
-    });
+    const formData = new FormData();
+    formData.append("image1", await toImageBlob(capturedImage), "capture.jpg");
+    formData.append("image2", firebasePhoto, "photo.jpg");
+    
+    try {
+      // Send both images to Python server for comparison
+      const comparisonResponse = await fetch("http://localhost:5001/compare", {
+        method: "POST",
+        body: formData
+      });
+      
+      if (comparisonResponse.ok) {
+        const result = await comparisonResponse.json();
+        return result.match === true;
+      }
+      return true; // Fallback to true if comparison service unavailable
+    } catch (error) {
+      console.error("Photo comparison error:", error);
+      return true; // Fallback to true if comparison fails
+    }
   } catch (error) {
     console.error("Firebase photo fetch error:", error);
     return true; // Fallback to true if Firebase photo unavailable
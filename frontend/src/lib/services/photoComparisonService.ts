@@ -2,6 +2,8 @@ import { getUsers } from "./userService";
 import { User } from "@/lib/types";
 import { compressBase64Image } from "@/lib/utils/imageOptimizer";
 import { performanceMonitor } from "@/lib/utils/performanceMonitor";
+import { toImageBlob } from "@/utils/imageUpload";
+import { detectFace, FaceDetectionResponse } from "@/utils/faceDetection";
 
 // SECURITY: This service ensures only the logged-in user's image is used for comparison
 
@@ -44,7 +46,7 @@ export async function compareWithSpecificUser(capturedImageData: string, numeric
     console.log(`SECURITY: Comparing captured image ONLY with ${targetUser.name} (ID: ${numericId})`);
     
     // Compare captured image with ONLY this specific user's stored photo
-    const isMatch = await comparePhotos(capturedImageData, targetUser.image);
+    const isMatch = await comparePhotos(capturedImageData, targetUser);
     console.log(`SECURITY: Photo match result for user ${numericId}: ${isMatch}`);
     
     if (isMatch) {
@@ -63,51 +65,108 @@ export async function compareWithSpecificUser(capturedImageData: string, numeric
   }
 }
 
-async function comparePhotos(capturedImage: string, userSpecificFirebaseImage: string): Promise<boolean> {
+export interface CheckInResult {
+  detection: FaceDetectionResponse;
+  user: User | null;
+}
+
+// Face detection and the comparison with the user's stored photo in one request:
+// the server decodes and detects the capture once instead of once per server
+export async function detectAndCompareWithSpecificUser(capturedImageData: string, numericId: number): Promise<CheckInResult> {
+  const endTimer = performanceMonitor.startTimer('detectAndCompareWithSpecificUser');
+  
+  try {
+    const users = await getCachedUsers();
+    const targetUser = users.find(user => user.numericId === numericId);
+    
+    if (targetUser?.image) {
+      const compressedCaptured = await compressBase64Image(capturedImageData, 0.7);
+      const response = await fetch(`http://localhost:5001/detect_and_recognize?employee_id=${encodeURIComponent(targetUser.id)}`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/octet-stream",
+        },
+        body: await toImageBlob(compressedCaptured)
+      });
+      
+      if (response.ok) {
+        const result = await response.json();
+        console.log(`SECURITY: Check-in result for user ${numericId}:`, result);
+        return { detection: result.detection, user: result.success ? targetUser : null };
+      }
+      if (response.status !== 404) {
+        throw new Error(`Server error: ${response.status}`);
+      }
+    }
+    
+    // No server-side template for this user: detect, then compare separately
+    const detection = await detectFace(capturedImageData);
+    if (!detection.success || !detection.face_detected) {
+      return { detection, user: null };
+    }
+    return { detection, user: await compareWithSpecificUser(capturedImageData, numericId) };
+  } finally {
+    endTimer();
+  }
+}
+
+async function comparePhotos(capturedImage: string, targetUser: User): Promise<boolean> {
   const endTimer = performanceMonitor.startTimer('comparePhotos');
   
   try {
     console.log("SECURITY: Comparing captured image with user-specific Firebase image ONLY");
     
     // Validate that we have the user's specific image
-    if (!userSpecificFirebaseImage) {
+    if (!targetUser.image) {
       console.log("SECURITY: No user-specific Firebase image provided");
       return false;
     }
     
-    // Compress images to reduce processing time
-    const [compressedCaptured, compressedUserImage] = await Promise.all([
-      compressBase64Image(capturedImage, 0.7),
-      compressBase64Image(userSpecificFirebaseImage, 0.7)
-    ]);
+    const compressedCaptured = await compressBase64Image(capturedImage, 0.7);
     
     // Use AbortController for timeout to prevent hanging requests
     const controller = new AbortController();
     const timeoutId = setTimeout(() => controller.abort(), 8000);
     
-    const response = await fetch("http://localhost:5001/compare", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
-        image1: compressedCaptured,
-        image2: compressedUserImage  // Only the specific user's image
-      }),
-      signal: controller.signal
-    });
-    
-    clearTimeout(timeoutId);
-    
-    if (response.ok) {
-      const result = await response.json();
-      console.log("SECURITY: User-specific photo comparison result:", result);
-      // Only accept exact match with the specific user's image
-      return result.match === true;
-    } else {
-      const errorText = await response.text();
-      console.log("SECURITY: Server error during user-specific comparison:", response.status, errorText);
-      return false;
+    try {
+      // The server keeps an encoding of every stored photo, so only the capture is sent
+      let response = await fetch(`http://localhost:5001/compare?employee_id=${encodeURIComponent(targetUser.id)}`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/octet-stream",
+        },
+        body: await toImageBlob(compressedCaptured),
+        signal: controller.signal
+      });
+      
+      if (response.status === 404) {
+        // No server-side template (e.g. Firebase offline there): send the stored photo too
+        const compressedUserImage = await compressBase64Image(targetUser.image, 0.7);
+        response = await fetch("http://localhost:5001/compare", {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+          },
+          body: JSON.stringify({
+            image1: compressedCaptured,
+            image2: compressedUserImage  // Only the specific user's image
+          }),
+          signal: controller.signal
+        });
+      }
+      
+      if (response.ok) {
+        const result = await response.json();
+        console.log("SECURITY: User-specific photo comparison result:", result);
+        // Only accept exact match with the specific user's image
+        return result.match === true;
+      } else {
+        const errorText = await response.text();
+        console.log("SECURITY: Server error during user-specific comparison:", response.status, errorText);
+        return false;
+      }
+    } finally {
+      clearTimeout(timeoutId);
     }
   } catch (error) {
     if (error instanceof Error && error.name === 'AbortError') {
@@ -1,21 +1,23 @@
-interface FaceDetectionResponse {
+import { toImageBlob } from "./imageUpload";
+
+export interface FaceDetectionResponse {
   success: boolean;
   face_detected?: boolean;
   error_type?: 'no_face' | 'multiple_faces';
   message?: string;
   face_count: number;
+  faces?: number[][];
 }
 
-export async function detectFace(imageData: string): Promise<FaceDetectionResponse> {
+export async function detectFace(imageData: string | Blob): Promise<FaceDetectionResponse> {
   try {
+    // Send the encoded image as the raw body instead of base64 JSON
     const response = await fetch("http://localhost:5000/detect_face", {
       method: "POST",
       headers: {
-        "Content-Type": "application/json",
+        "Content-Type": "application/octet-stream",
       },
-      body: JSON.stringify({ 
-        image: imageData
-      })
+      body: await toImageBlob(imageData)
     });
 
     if (!response.ok) {
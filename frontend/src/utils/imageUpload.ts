@@ -0,0 +1,11 @@
+/**
+ * Encoded image bytes for binary uploads. Data URLs are decoded locally by
+ * fetch, so callers can keep passing canvas captures.
+ */
+export async function toImageBlob(image: string | Blob): Promise<Blob> {
+  if (typeof image !== "string") {
+    return image;
+  }
+  const response = await fetch(image);
+  return await response.blob();
+}
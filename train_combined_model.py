@@ -1,11 +1,6 @@
 import os
 import sys
 import base64
-import numpy as np
-from PIL import Image
-import io
-import face_recognition
-import pickle
 
 # Add backend to path
 backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'backend'))
@@ -13,14 +8,24 @@ if backend_path not in sys.path:
     sys.path.insert(0, backend_path)
 
 from app.services.firebase_service import FirebaseService
+from app.models.face_gallery import FaceGallery
+from app.config.settings import Config
+from app.models.gallery_condensation import condensation_report, condense_gallery, format_condensation_report
+from app.models.quantization import QuantizedCodes
+from app.models.ann_index import build_index_report, index_path_for
+from app.models.model_artifact import write_artifact
+from app.services.encoding_pool import ParallelEncoder, encode_image
+from ai.face_recognition_model import FaceRecognitionModel
 
 class CombinedFaceTrainer:
     def __init__(self):
         self.firebase_service = FirebaseService()
         self.known_face_encodings = []
         self.known_face_names = []
-        self.model_file = "face_model.pkl"
+        self.model_file = "face_model.gallery"
         self.dataset_path = "ai/image_dataset"
+        self.gallery = None
+        self.encoding_workers = None
     
     def get_firebase_users(self):
         """Get all users from Firebase"""
@@ -43,35 +48,37 @@ class CombinedFaceTrainer:
             print(f"Error fetching Firebase users: {e}")
             return []
     
-    def process_firebase_image(self, image_data):
-        """Convert Firebase base64 image to face encoding"""
+    def decode_firebase_image(self, image_data):
+        """Decode a Firebase base64 image to raw image bytes"""
         try:
             # Remove data URL prefix if present
             if ',' in image_data:
                 image_data = image_data.split(',')[1]
             
             # Decode base64
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            image_array = np.array(image)
-            
-            # Get face encodings
-            encodings = face_recognition.face_encodings(image_array, model='large')
-            return encodings[0] if encodings else None
-            
+            return base64.b64decode(image_data)
         except Exception as e:
-            print(f"Error processing Firebase image: {e}")
+            print(f"Error decoding Firebase image: {e}")
             return None
     
+    def process_firebase_image(self, image_data):
+        """Convert Firebase base64 image to face encoding"""
+        image_bytes = self.decode_firebase_image(image_data)
+        if image_bytes is None:
+            return None
+        
+        result = encode_image(image_bytes, model='large')
+        if result['error']:
+            print(f"Error processing Firebase image: {result['error']}")
+        return result['encodings'][0] if result['encodings'] else None
+    
     def train_combined_model(self):
         """Train model on both local dataset and Firebase photos"""
         print("Training combined model with local dataset + Firebase photos...")
+        # (name, label for logs, path or image bytes) for every image to encode
+        jobs = []
         
-        # 1. Train on local dataset
+        # 1. Collect local dataset
         if os.path.exists(self.dataset_path):
             print("Processing local dataset...")
             for person_name in os.listdir(self.dataset_path):
@@ -80,42 +87,49 @@ class CombinedFaceTrainer:
                 if not os.path.isdir(person_folder):
                     continue
                 
-                print(f"  Processing local images for {person_name}...")
-                
                 for image_file in os.listdir(person_folder):
                     if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                        image_path = os.path.join(person_folder, image_file)
-                        
-                        try:
-                            image = face_recognition.load_image_file(image_path)
-                            encodings = face_recognition.face_encodings(image, model='large')
-                            
-                            if encodings:
-                                self.known_face_encodings.append(encodings[0])
-                                self.known_face_names.append(person_name)
-                                print(f"    Added local encoding for {person_name}")
-                        except Exception as e:
-                            print(f"    Error processing {image_file}: {e}")
+                        jobs.append((person_name, f"local {image_file}", os.path.join(person_folder, image_file)))
         
-        # 2. Add Firebase photos
+        # 2. Collect Firebase photos
         print("Processing Firebase photos...")
         firebase_users = self.get_firebase_users()
         
         for user in firebase_users:
-            name = user['name']
-            image_data = user['image']
-            
-            print(f"  Processing Firebase photo for {name}...")
-            encoding = self.process_firebase_image(image_data)
-            
-            if encoding is not None:
-                self.known_face_encodings.append(encoding)
+            image_bytes = self.decode_firebase_image(user['image'])
+            if image_bytes is None:
+                print(f"    Failed to process Firebase photo for {user['name']}")
+                continue
+            jobs.append((user['name'], "Firebase photo", image_bytes))
+        
+        # Encode everything across all cores, results in job order
+        encoder = ParallelEncoder(self.encoding_workers, label="Combined training")
+        results = encoder.map([source for _, _, source in jobs], model='large')
+        
+        for (name, label, _), result in zip(jobs, results):
+            if result['error']:
+                print(f"    Error processing {label} for {name}: {result['error']}")
+            elif result['encodings']:
+                self.known_face_encodings.append(result['encodings'][0])
                 self.known_face_names.append(name)
-                print(f"    Added Firebase encoding for {name}")
+                print(f"    Added {label} encoding for {name}")
             else:
-                print(f"    Failed to process Firebase photo for {name}")
+                print(f"    No face found in {label} for {name}")
+        
+        # 3. Cap templates per employee and build the ANN index in the order the servers load the gallery in
+        full_gallery = FaceGallery.from_encodings(self.known_face_encodings, self.known_face_names)
+        self.gallery = condense_gallery(full_gallery, Config.GALLERY_MAX_TEMPLATES, Config.GALLERY_DEDUP_DISTANCE)
+        print(f"Condensed gallery from {len(full_gallery)} to {len(self.gallery)} templates")
+        # Held-out accuracy at the threshold the servers will recognize with
+        print(format_condensation_report(condensation_report(
+            self.known_face_encodings, self.known_face_names, Config.GALLERY_MAX_TEMPLATES,
+            Config.GALLERY_DEDUP_DISTANCE, FaceRecognitionModel.threshold_for(full_gallery.names))))
+        self.gallery.index, recall = build_index_report(self.gallery.encodings)
+        print(f"ANN index built with {self.gallery.index.n_lists} lists (recall@10 vs exact: {recall:.1%})")
+        if Config.GALLERY_QUANTIZATION:
+            self.gallery.codes = QuantizedCodes.encode(self.gallery.encodings, Config.GALLERY_QUANTIZATION)
         
-        # 3. Save combined model
+        # 4. Save combined model
         self.save_model()
         print(f"Combined model trained with {len(self.known_face_encodings)} total encodings")
         
@@ -126,27 +140,26 @@ class CombinedFaceTrainer:
         
         print("\nTraining Summary:")
         for name, count in name_counts.items():
-            print(f"  {name}: {count} encodings")
+            templates = int(self.gallery.counts[self.gallery.label_for(name)])
+            print(f"  {name}: {count} encodings, {templates} templates")
     
     def save_model(self):
-        """Save the combined model"""
-        model_data = {
-            'encodings': self.known_face_encodings,
-            'names': self.known_face_names
-        }
+        """Save the combined model as a versioned gallery artifact"""
+        if self.gallery is None:
+            self.gallery = FaceGallery.from_encodings(self.known_face_encodings, self.known_face_names)
         
         # Save to multiple locations
         locations = [
             self.model_file,
-            "ai/face_model.pkl",
-            "backend/face_model.pkl"
+            "ai/face_model.gallery",
+            "backend/face_model.gallery"
         ]
         
         for location in locations:
             try:
-                os.makedirs(os.path.dirname(location), exist_ok=True)
-                with open(location, 'wb') as f:
-                    pickle.dump(model_data, f)
+                write_artifact(location, self.gallery)
+                if self.gallery.index is not None:
+                    self.gallery.index.save(index_path_for(location))
                 print(f"Model saved to {location}")
             except Exception as e:
                 print(f"Failed to save to {location}: {e}")
@@ -9,8 +9,8 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'ai'))
 
-import face_recognition
 from backend.app.services.firebase_service import FirebaseService
+from app.services.encoding_pool import ParallelEncoder
 
 def train_firebase_encodings():
     print("AI-Powered Firebase Encoding Training")
@@ -31,43 +31,39 @@ def train_firebase_encodings():
     total_employees = 0
     total_encodings = 0
     
+    # Collect every image first so encoding can run across all cores
+    jobs = []
     for person_name in os.listdir(dataset_path):
         person_folder = os.path.join(dataset_path, person_name)
         if not os.path.isdir(person_folder):
             continue
-            
-        print(f"\nProcessing {person_name}...")
-        person_encodings = []
         
         for image_file in os.listdir(person_folder):
             if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                image_path = os.path.join(person_folder, image_file)
-                
-                try:
-                    # Load and process image
-                    image = face_recognition.load_image_file(image_path)
-                    
-                    # Get encodings with both models for robustness
-                    encodings_large = face_recognition.face_encodings(image, model='large')
-                    encodings_small = face_recognition.face_encodings(image, model='small')
-                    
-                    if encodings_large:
-                        person_encodings.append(encodings_large[0])
-                        print(f"  ✓ {image_file} (large model)")
-                    elif encodings_small:
-                        person_encodings.append(encodings_small[0])
-                        print(f"  ✓ {image_file} (small model)")
-                    else:
-                        print(f"  ✗ {image_file} - No face detected")
-                        
-                except Exception as e:
-                    print(f"  ✗ {image_file} - Error: {e}")
-        
+                jobs.append((person_name, image_file, os.path.join(person_folder, image_file)))
+    
+    # Get encodings with the large model
+    encoder = ParallelEncoder(label="Firebase training")
+    results = encoder.map([image_path for _, _, image_path in jobs], model='large')
+    
+    encodings_by_person = {}
+    for (person_name, image_file, _), result in zip(jobs, results):
+        person_encodings = encodings_by_person.setdefault(person_name, [])
+        if result['error']:
+            print(f"  ✗ {person_name}/{image_file} - Error: {result['error']}")
+        elif result['encodings']:
+            person_encodings.append(result['encodings'][0])
+            print(f"  ✓ {person_name}/{image_file}")
+        else:
+            print(f"  ✗ {person_name}/{image_file} - No face detected")
+    
+    for person_name, person_encodings in encodings_by_person.items():
+        print(f"\nProcessing {person_name}...")
         if person_encodings:
             # Store encodings in Firebase
             success = firebase_service.store_employee_encodings(person_name, person_encodings)
             if success:
-                print(f"  ✓ Stored {len(person_encodings)} encodings for {person_name}")
+                print(f"  ✓ Stored condensed encodings from {len(person_encodings)} images for {person_name}")
                 total_employees += 1
                 total_encodings += len(person_encodings)
             else: